@@ -0,0 +1,104 @@
+'''Batch shuffling of many decks at once with NumPy
+
+Decks are rows of a 2-D uint8 array holding the integer card encoding
+from cards.card_index, in the same order as Deck.cards (the last column
+is the top of the deck). Rows can be turned back into Deck or
+CompactDeck objects when needed.
+'''
+import numpy as np
+
+import cards
+
+
+def shuffled_decks(n_decks, rng):
+    '''returns n_decks independently shuffled full decks
+
+    Each row is shuffled with a batched Fisher-Yates pass
+    (Generator.permuted), so the whole batch is one NumPy call.
+
+    Parameters
+    ----------
+    n_decks: int
+        the number of decks (rows) to make
+    rng: numpy.random.Generator
+        the random source
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 array of shape (n_decks, 52)
+    '''
+    ordered = np.tile(np.arange(cards.DECK_SIZE, dtype=np.uint8), (n_decks, 1))
+    rng.permuted(ordered, axis=1, out=ordered)
+    return ordered
+
+
+class BatchShuffler:
+    '''produces reproducible batches of shuffled decks
+
+    Batch k is drawn from its own generator spawned from the base seed,
+    so any batch can be regenerated on its own, and the result does not
+    depend on how many batches were drawn before it.
+
+    Instance Attributes
+    -------------------
+    seed: int or None
+        the base seed. None picks fresh OS entropy.
+    batch_size: int
+        the number of decks in each batch
+    seed_sequence: numpy.random.SeedSequence
+        the root the per-batch generators are derived from
+    '''
+
+    def __init__(self, seed=None, batch_size=1000):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.seed_sequence = np.random.SeedSequence(seed)
+
+    def batch(self, k):
+        '''returns batch number k as a (batch_size, 52) uint8 array'''
+        child = np.random.SeedSequence(self.seed_sequence.entropy,
+                                       spawn_key=(k,))
+        return shuffled_decks(self.batch_size, np.random.default_rng(child))
+
+    def batches(self, n_decks):
+        '''yields batches until n_decks decks have been produced
+
+        The last batch is trimmed so the total is exactly n_decks.
+        '''
+        k = 0
+        while n_decks > 0:
+            rows = self.batch(k)
+            yield rows[:n_decks]
+            n_decks -= len(rows)
+            k += 1
+
+
+def row_to_deck(row):
+    '''converts one row of encoded cards into a Deck
+
+    The Deck holds the shared Cards from cards.CARD_TABLE.
+    '''
+    deck = cards.Deck()
+    deck.cards = [cards.CARD_TABLE[i] for i in row.tolist()]
+    deck.reindex()
+    return deck
+
+
+def row_to_compact_deck(row):
+    '''converts one row of encoded cards into a CompactDeck'''
+    deck = cards.CompactDeck()
+    deck.cards = bytearray(row.astype(np.uint8).tobytes())
+    deck.reindex()
+    return deck
+
+
+def decks_to_rows(decks):
+    '''stacks full Decks or CompactDecks into a (len(decks), 52) array'''
+    rows = np.empty((len(decks), cards.DECK_SIZE), dtype=np.uint8)
+    for r, deck in enumerate(decks):
+        if isinstance(deck, cards.CompactDeck):
+            rows[r] = np.frombuffer(deck.cards, dtype=np.uint8)
+        else:
+            rows[r] = [c.to_index() for c in deck.cards]
+    return rows
@@ -0,0 +1,338 @@
+'''Benchmarks for cards.py
+
+The suite times each Card/Deck operation at several scales (number of
+decks), records peak memory with tracemalloc and writes the results to
+a JSON file that can be compared with an earlier run:
+
+    python benchmarks.py --output bench_results.json
+    python benchmarks.py --scales 1 1000 --compare old_results.json
+
+The bench_* functions print side-by-side comparisons of alternative
+implementations (run them with --micro).
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import cards
+
+
+def memory_per_deck(factory, count=1000):
+    '''measures the average memory held by one deck
+
+    Parameters
+    ----------
+    factory: callable
+        builds one deck
+    count: int
+        number of decks kept alive while measuring
+
+    Returns
+    -------
+    float
+        bytes allocated per deck
+    '''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    decks = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del decks
+    return (after - before) / count
+
+
+def rate(func, number=10000):
+    '''returns how many times per second func can be called'''
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    return number / seconds
+
+
+def bench_construction():
+    '''prints memory per deck and construction rate for each deck type'''
+    for name, factory in [("Deck", cards.Deck), ("CompactDeck", cards.CompactDeck),
+                          ("Shoe(8)", lambda: cards.Shoe(8))]:
+        print("{:<12} {:>10.0f} bytes/deck {:>12.0f} decks/s".format(
+            name, memory_per_deck(factory), rate(factory)))
+
+
+def bench_reset(number=100000):
+    '''prints construction and sort_cards (reset) rate for each deck type'''
+    for name, factory in [("Deck", cards.Deck), ("CompactDeck", cards.CompactDeck)]:
+        deck = factory()
+        deck.deal_hand(10)
+        print("{:<12} {:>12.0f} new/s {:>12.0f} resets/s".format(
+            name, rate(factory, number), rate(deck.sort_cards, number)))
+
+
+def bench_dealing(n_players=6, hand_size=5, number=20000):
+    '''prints tables dealt per second, looping deal_hand vs deal_hands'''
+    def per_card():
+        deck = cards.Deck()
+        return [[deck.deal_card() for _ in range(hand_size)] for _ in range(n_players)]
+
+    def loop(factory):
+        def run():
+            deck = factory()
+            return [deck.deal_hand(hand_size) for _ in range(n_players)]
+        return run
+
+    def batch(factory):
+        def run():
+            return factory().deal_hands(n_players, hand_size)
+        return run
+
+    cases = [
+        ("Deck deal_card loop", per_card),
+        ("Deck deal_hand loop", loop(cards.Deck)),
+        ("Deck deal_hands", batch(cards.Deck)),
+        ("CompactDeck deal_hand loop", loop(cards.CompactDeck)),
+        ("CompactDeck deal_hands", batch(cards.CompactDeck)),
+    ]
+    for name, func in cases:
+        print("{:<28} {:>12.0f} tables/s".format(name, rate(func, number)))
+
+
+def bench_formatting(n_hands=100000, hand_size=5):
+    '''prints hands formatted per second: per-card concatenation (the old
+    print_hand loop) vs format_hand, and write_hands into a buffer
+    '''
+    import io
+    deck = cards.Deck()
+    hands = []
+    for _ in range(n_hands):
+        deck.shuffle()
+        hands.append(deck.cards[:hand_size])
+
+    def concat():
+        for hand in hands:
+            hand_str = '/ '
+            for c in hand:
+                hand_str += c.rank_name[0] + "of" + c.suit_name[0] + ' / '
+
+    def joined():
+        for hand in hands:
+            cards.format_hand(hand)
+
+    def streamed():
+        cards.write_hands(hands, io.StringIO())
+
+    for name, func in [("concatenate", concat), ("format_hand", joined), ("write_hands", streamed)]:
+        print("{:<12} {:>12.0f} hands/s".format(name, n_hands * rate(func, 1)))
+
+
+def bench_poker(n_hands=200000):
+    '''prints 5- and 7-card hands scored per second by poker.evaluate_indices
+    and, with NumPy, by poker.evaluate_batch
+    '''
+    import poker
+    deck = cards.CompactDeck()
+    for size in (5, 7):
+        hands = []
+        for _ in range(n_hands):
+            deck.shuffle()
+            hands.append(list(deck.cards[:size]))
+        start = timeit.default_timer()
+        for hand in hands:
+            poker.evaluate_indices(hand)
+        single = n_hands / (timeit.default_timer() - start)
+        start = timeit.default_timer()
+        poker.evaluate_batch(hands)
+        batch = n_hands / (timeit.default_timer() - start)
+        print("{}-card {:>12.0f} hands/s single {:>12.0f} hands/s batch".format(size, single, batch))
+
+
+def bench_equity(trials=100000):
+    '''prints equity trials per second for 1, 2, 4, ... worker processes'''
+    import os
+    import equity
+    hands = [[0, 13], [25, 38]] # A-A vs K-K, encoded
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = timeit.default_timer()
+        equity.estimate_equity(hands, trials=trials, workers=workers, seed=0)
+        print("{:>3} workers {:>12.0f} trials/s".format(
+            workers, trials / (timeit.default_timer() - start)))
+        workers *= 2
+
+
+def dealt_deck(factory):
+    '''returns a setup function giving (deck, card dealt from it)'''
+    def setup():
+        deck = factory()
+        deck.shuffle()
+        return deck, deck.deal_card()
+    return setup
+
+
+def shuffled(factory):
+    '''returns a setup function giving a shuffled deck'''
+    def setup():
+        deck = factory()
+        deck.shuffle()
+        return deck
+    return setup
+
+
+# name: (setup, operation). setup() builds the input of one operation and
+# is not timed; None means the operation takes no input.
+OPERATIONS = {
+    "Card": (None, lambda _: cards.Card(2, 12)),
+    "Deck.__init__": (None, lambda _: cards.Deck()),
+    "Deck.shuffle": (cards.Deck, lambda d: d.shuffle()),
+    "Deck.deal_card": (cards.Deck, lambda d: d.deal_card()),
+    "Deck.deal_hand": (cards.Deck, lambda d: d.deal_hand(5)),
+    "Deck.replace_card": (dealt_deck(cards.Deck), lambda dc: dc[0].replace_card(dc[1])),
+    "Deck.sort_cards": (shuffled(cards.Deck), lambda d: d.sort_cards()),
+    "CompactDeck.__init__": (None, lambda _: cards.CompactDeck()),
+    "CompactDeck.shuffle": (cards.CompactDeck, lambda d: d.shuffle()),
+    "CompactDeck.deal_card": (cards.CompactDeck, lambda d: d.deal_card()),
+    "CompactDeck.deal_hand": (cards.CompactDeck, lambda d: d.deal_hand(5)),
+    "CompactDeck.replace_card": (dealt_deck(cards.CompactDeck), lambda dc: dc[0].replace_card(dc[1])),
+    "CompactDeck.sort_cards": (shuffled(cards.CompactDeck), lambda d: d.sort_cards()),
+}
+
+DEFAULT_SCALES = [1, 1000, 1000000]
+BATCH_SIZE = 1000
+
+
+def run_operation(setup, operation, scale):
+    '''times operation once per deck for scale decks
+
+    Inputs are built BATCH_SIZE at a time, so memory stays bounded at
+    large scales. A second, traced pass over one batch measures memory.
+
+    Returns
+    -------
+    dict
+        seconds, ops_per_sec, peak_bytes and peak_bytes_per_op
+    '''
+    seconds = 0.0
+    done = 0
+    while done < scale:
+        size = min(BATCH_SIZE, scale - done)
+        inputs = [setup() for _ in range(size)] if setup else [None] * size
+        start = time.perf_counter()
+        for item in inputs:
+            operation(item)
+        seconds += time.perf_counter() - start
+        done += size
+
+    size = min(BATCH_SIZE, scale)
+    inputs = [setup() for _ in range(size)] if setup else [None] * size
+    tracemalloc.start()
+    outputs = [operation(item) for item in inputs]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del outputs
+    return {
+        "seconds": seconds,
+        "ops_per_sec": scale / seconds if seconds else None,
+        "peak_bytes": peak,
+        "peak_bytes_per_op": peak / size,
+    }
+
+
+def run_suite(scales=DEFAULT_SCALES, names=None):
+    '''runs every operation in OPERATIONS (or just names) at every scale
+
+    Returns
+    -------
+    dict
+        metadata and a "results" list, ready for json.dump
+    '''
+    results = []
+    for name in names or OPERATIONS:
+        setup, operation = OPERATIONS[name]
+        for scale in scales:
+            row = {"name": name, "scale": scale}
+            row.update(run_operation(setup, operation, scale))
+            results.append(row)
+            print("{:<26} {:>8} decks {:>14.0f} ops/s {:>10.0f} B/op peak".format(
+                name, scale, row["ops_per_sec"] or 0, row["peak_bytes_per_op"]))
+    return {
+        "cards_version": cards.VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=0.10):
+    '''compares two run_suite outputs
+
+    Parameters
+    ----------
+    old, new: dict
+        loaded results files
+    threshold: float
+        relative slowdown or memory growth reported as a regression
+
+    Returns
+    -------
+    list
+        (name, scale, metric, old value, new value) for each regression
+    '''
+    before = {(r["name"], r["scale"]): r for r in old["results"]}
+    regressions = []
+    for row in new["results"]:
+        key = (row["name"], row["scale"])
+        if key not in before:
+            continue
+        prior = before[key]
+        if prior["ops_per_sec"] and row["ops_per_sec"] and \
+                row["ops_per_sec"] < prior["ops_per_sec"] * (1 - threshold):
+            regressions.append(key + ("ops_per_sec", prior["ops_per_sec"], row["ops_per_sec"]))
+        if row["peak_bytes_per_op"] > prior["peak_bytes_per_op"] * (1 + threshold):
+            regressions.append(key + ("peak_bytes_per_op", prior["peak_bytes_per_op"],
+                                      row["peak_bytes_per_op"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for cards.py")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="numbers of decks to run each operation on")
+    parser.add_argument("--only", nargs="+", choices=sorted(OPERATIONS),
+                        help="run only these operations")
+    parser.add_argument("--output", default="bench_results.json",
+                        help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="OLD_JSON",
+                        help="report regressions against an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change counted as a regression")
+    parser.add_argument("--micro", action="store_true",
+                        help="run the bench_* comparisons instead of the suite")
+    args = parser.parse_args(argv)
+
+    if args.micro:
+        bench_construction()
+        bench_reset()
+        bench_dealing()
+        bench_formatting()
+        bench_poker()
+        bench_equity()
+        return 0
+
+    report = run_suite(args.scales, args.only)
+    with open(args.output, "w") as fw:
+        json.dump(report, fw, indent=2)
+    print("Results written to", args.output)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            old = json.load(f)
+        regressions = compare(old, report, args.threshold)
+        for name, scale, metric, was, now in regressions:
+            print("REGRESSION {} @ {} decks: {} {:.0f} -> {:.0f}".format(name, scale, metric, was, now))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,101 @@
+import numbers
+import operator
 import random
+import sys
 import unittest
 
 VERSION = 0.01
 
+SUIT_COUNT = 4
+RANK_COUNT = 13
+DECK_SIZE = SUIT_COUNT * RANK_COUNT
+
+
+def card_index(suit, rank):
+    '''encodes a (suit, rank) pair as a single integer 0-51
+
+    The encoding follows the order in which a new Deck is built:
+    suit major, rank minor, so 0 is the Ace of Diamonds and 51 is
+    the King of Spades.
+
+    Parameters
+    ----------
+    suit: int
+        the suit index (0-3)
+    rank: int
+        the rank (1-13)
+
+    Returns
+    -------
+    int
+        the card index
+    '''
+    return suit * RANK_COUNT + rank - 1
+
+
+FULL_MASK = (1 << DECK_SIZE) - 1
+
+
+def mask_of(indices):
+    '''builds a membership bitmask with one bit set per card index
+
+    Parameters
+    ----------
+    indices: iterable of int
+        integer-encoded cards
+
+    Returns
+    -------
+    int
+        the bitmask (bit i set means card i is present)
+    '''
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+DEAL_ORDERS = ("round_robin", "block")
+
+
+def split_hands(top, n_players, hand_size, order="round_robin"):
+    '''splits cards taken off the top of a deck into player hands
+
+    Parameters
+    ----------
+    top: sequence
+        n_players * hand_size cards, top card first
+    n_players: int
+        the number of hands to make
+    hand_size: int
+        the number of cards in each hand
+    order: string
+        "round_robin" deals one card to each player in turn, like a
+        dealer at a table. "block" gives each player hand_size
+        consecutive cards, so player 0 gets what deal_hand would return.
+
+    Returns
+    -------
+    list
+        n_players slices of top, each the same type as top
+    '''
+    if order == "round_robin":
+        return [top[p::n_players] for p in range(n_players)]
+    if order == "block":
+        return [top[p * hand_size:(p + 1) * hand_size] for p in range(n_players)]
+    raise ValueError(f"order must be one of {DEAL_ORDERS}, not {order!r}")
+
+
+def index_suit(index):
+    '''returns the suit of an integer-encoded card'''
+    return index // RANK_COUNT
+
+
+def index_rank(index):
+    '''returns the rank (1-13) of an integer-encoded card'''
+    return index % RANK_COUNT + 1
+
+
 class Card:
     '''a standard playing card
     cards will have a suit and a rank
@@ -41,8 +134,65 @@ class Card:
             self.rank_name = str(self.rank)
  
     def __str__(self):
+        if 0 <= self.suit < SUIT_COUNT and 1 <= self.rank <= RANK_COUNT:
+            return CARD_NAMES[self.suit * RANK_COUNT + self.rank - 1]
         return f"{self.rank_name} of {self.suit_name}"
- 
+
+    def is_standard(self):
+        '''returns True if this is one of the 52 cards of a standard deck'''
+        return 0 <= self.suit < SUIT_COUNT and 1 <= self.rank <= RANK_COUNT
+
+    def to_index(self):
+        '''returns the integer encoding (0-51) of this card'''
+        return card_index(self.suit, self.rank)
+
+    @classmethod
+    def from_index(cls, index):
+        '''builds a new Card from its integer encoding'''
+        return cls(index_suit(index), index_rank(index))
+
+
+class SharedCard(Card):
+    '''a Card that cannot be changed once built
+
+    Every Deck holds the same 52 SharedCards, so changing one would
+    change it in every Deck; setting an attribute raises AttributeError.
+    '''
+    _frozen = False
+
+    def __init__(self, suit=0, rank=2):
+        super().__init__(suit, rank)
+        object.__setattr__(self, "_frozen", True)
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"shared card {self} cannot be changed; use Card({self.suit}, {self.rank}) for a copy")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"shared card {self} cannot be changed")
+
+
+# one shared, immutable Card per index, in the order a new Deck holds
+# them. Built once; new and sorted Decks copy the references.
+CARD_TABLE = tuple(SharedCard.from_index(i) for i in range(DECK_SIZE))
+CANONICAL_BYTES = bytes(range(DECK_SIZE))
+
+# precomputed renderings per card index: "Queen of Clubs" and, as used
+# by print_hand, "QofC / "
+CARD_NAMES = tuple(f"{c.rank_name} of {c.suit_name}" for c in CARD_TABLE)
+HAND_TOKENS = tuple(c.rank_name[0] + "of" + c.suit_name[0] + " / " for c in CARD_TABLE)
+
+
+def suit_name_of(index):
+    '''returns the suit name of an integer-encoded card'''
+    return Card.suit_names[index // RANK_COUNT]
+
+
+def rank_name_of(index):
+    '''returns the rank name of an integer-encoded card'''
+    return CARD_TABLE[index].rank_name
+
 
 class Deck:
     '''a deck of Cards
@@ -51,16 +201,28 @@ class Deck:
     cards: list
         the list of Cards currently in the Deck. Initialized to contain
         all 52 cards in a standard deck
+    card_mask: int
+        membership bitmask keyed by card_index(suit, rank), kept in sync
+        by the Deck methods. Call reindex() after editing cards directly.
+        Cards outside the standard 52 have no bit and are found by
+        comparing strings, as replace_card always did.
     '''
 
     def __init__(self): 
 
-        self.cards = []
-        for suit in range(4):
-            for rank in range(1,14):
-                card = Card(suit,rank)
-                self.cards.append(card) # appends in a sorted order
- 
+        self.cards = list(CARD_TABLE) # the shared Cards, in sorted order
+        self.card_mask = FULL_MASK
+
+    def reindex(self):
+        '''rebuilds card_mask from self.cards'''
+        self.card_mask = mask_of(c.to_index() for c in self.cards if c.is_standard())
+
+    def has_card(self, card):
+        '''returns True if a card with the same suit and rank is in the Deck'''
+        if card.is_standard():
+            return bool(self.card_mask >> card.to_index() & 1)
+        return str(card) in [str(c) for c in self.cards]
+
     def deal_card(self, i=-1):
         '''remove a card from the Deck
         Parameters  
@@ -72,7 +234,10 @@ class Deck:
         Card
             the Card that was removed
         '''
-        return self.cards.pop(i) 
+        card = self.cards.pop(i)
+        if card.is_standard():
+            self.card_mask &= ~(1 << card.to_index())
+        return card
  
     def shuffle(self):
         '''shuffles (randomizes the order) of the Cards
@@ -87,11 +252,23 @@ class Deck:
         random.shuffle(self.cards)
  
     def replace_card(self, card):
-        card_strs = [] # forming an empty list
-        for c in self.cards: # each card in self.cards (the initial list)
-            card_strs.append(c.__str__()) # appends the string that represents that card to the empty list
-        if card.__str__() not in card_strs: # if the string representing this card is not in the list already
-            self.cards.append(card) # append it to the list
+        '''adds a card to the Deck unless one with the same suit and rank
+        is already there
+
+        Membership of a standard card is checked against card_mask, so
+        this is constant-time.
+        Parameters
+        ----------
+        card: Card
+            the card to put back
+        Returns
+        -------
+        None
+        '''
+        if not self.has_card(card):
+            self.cards.append(card)
+            if card.is_standard():
+                self.card_mask |= 1 << card.to_index()
     
     def sort_cards(self):
         '''returns the Deck to its original order
@@ -105,12 +282,9 @@ class Deck:
         -------
         None
         '''
-        self.cards = []
-        for suit in range(4):
-            for rank in range(1,14):
-                card = Card(suit,rank)
-                self.cards.append(card)
- 
+        self.cards[:] = CARD_TABLE
+        self.card_mask = FULL_MASK
+
     def deal_hand(self, hand_size):
         '''removes and returns hand_size cards from the Deck
         
@@ -125,10 +299,295 @@ class Deck:
         list
             the top hand_size cards from the Deck
         '''
-        hand_cards = []
-        for i in range(hand_size):
-            hand_cards.append(self.deal_card())
-        return hand_cards
+        return self.take_top(hand_size)
+
+    def deal_hands(self, n_players, hand_size, order="round_robin"):
+        '''deals hand_size cards to each of n_players in one operation
+
+        Parameters
+        -------------------
+        n_players: int
+            the number of players
+        hand_size: int
+            the number of cards per player
+        order: string (optional)
+            "round_robin" (default) or "block", see split_hands
+        Returns
+        -------
+        list
+            one list of Cards per player
+        '''
+        if order not in DEAL_ORDERS:
+            raise ValueError(f"order must be one of {DEAL_ORDERS}, not {order!r}")
+        return split_hands(self.take_top(n_players * hand_size), n_players, hand_size, order)
+
+    def take_top(self, count):
+        '''removes the top count cards with a single slice
+
+        Parameters
+        -------------------
+        count: int
+            the number of cards to remove
+        Returns
+        -------
+        list
+            the removed cards, top card first
+        '''
+        if count > len(self.cards):
+            raise IndexError("pop from empty list")
+        if count <= 0:
+            return []
+        top = self.cards[:-count - 1:-1]
+        del self.cards[-count:]
+        self.card_mask &= ~mask_of(c.to_index() for c in top if c.is_standard())
+        return top
+
+class CompactDeck:
+    '''a deck of cards stored as one byte per card
+
+    Behaves like Deck, but each card is its integer encoding (see
+    card_index) rather than a Card object, so a full deck is a single
+    52-byte bytearray. Suit and rank names are derived on demand with
+    suit_name_of/rank_name_of, or use CARD_TABLE to get the shared Card.
+
+    Instance Attributes
+    -------------------
+    cards: bytearray
+        the encoded cards currently in the deck, in the same order a
+        Deck would hold them
+    card_mask: int
+        membership bitmask of the encoded cards, as in Deck
+    '''
+
+    def __init__(self):
+        self.cards = bytearray(CANONICAL_BYTES)
+        self.card_mask = FULL_MASK
+
+    def reindex(self):
+        '''rebuilds card_mask from self.cards'''
+        self.card_mask = mask_of(self.cards)
+
+    def has_card(self, card):
+        '''returns True if the encoded card is in the deck'''
+        return bool(self.card_mask >> card & 1)
+
+    def deal_card(self, i=-1):
+        '''remove a card from the deck
+        Parameters
+        -------------------
+        i: int (optional)
+            the index of the card to remove. Default (-1) will remove the "top" card
+        Returns
+        -------
+        int
+            the encoded card that was removed
+        '''
+        card = self.cards.pop(i)
+        self.card_mask &= ~(1 << card)
+        return card
+
+    def shuffle(self):
+        '''shuffles the cards in place'''
+        random.shuffle(self.cards)
+
+    def replace_card(self, card):
+        '''adds an encoded card to the deck unless it is already there'''
+        bit = 1 << card
+        if not self.card_mask & bit:
+            self.cards.append(card)
+            self.card_mask |= bit
+
+    def sort_cards(self):
+        '''returns the deck to its original order'''
+        self.cards[:] = CANONICAL_BYTES
+        self.card_mask = FULL_MASK
+
+    def deal_hand(self, hand_size):
+        '''removes and returns hand_size cards from the deck
+
+        Parameters
+        -------------------
+        hand_size: int
+            the number of cards to deal
+        Returns
+        -------
+        bytearray
+            the top hand_size encoded cards, top card first
+        '''
+        return self.take_top(hand_size)
+
+    def deal_hands(self, n_players, hand_size, order="round_robin"):
+        '''deals hand_size cards to each of n_players in one operation
+
+        See Deck.deal_hands. Each hand is a bytearray of encoded cards.
+        '''
+        if order not in DEAL_ORDERS:
+            raise ValueError(f"order must be one of {DEAL_ORDERS}, not {order!r}")
+        return split_hands(self.take_top(n_players * hand_size), n_players, hand_size, order)
+
+    def take_top(self, count):
+        '''removes the top count encoded cards, top card first'''
+        if count > len(self.cards):
+            raise IndexError("pop from empty deck")
+        if count <= 0:
+            return bytearray()
+        top = self.cards[:-count - 1:-1]
+        del self.cards[-count:]
+        self.card_mask &= ~mask_of(top)
+        return top
+
+    def to_deck(self):
+        '''returns a Deck holding the same cards in the same order'''
+        deck = Deck()
+        deck.cards = [CARD_TABLE[i] for i in self.cards]
+        deck.card_mask = self.card_mask
+        return deck
+
+    @classmethod
+    def from_deck(cls, deck):
+        '''returns a CompactDeck holding the same cards as a Deck'''
+        compact = cls()
+        compact.cards = bytearray(c.to_index() for c in deck.cards)
+        compact.reindex()
+        return compact
+
+
+class Shoe:
+    '''a casino shoe of n_decks standard decks, dealt lazily
+
+    The shoe stores no order at all, only dealt_counts, so its memory
+    does not grow with n_decks. Once shuffled, each deal_card() picks
+    one of the undealt copies uniformly, weighting each of the 52 cards
+    by its remaining count, which deals the same distribution as a
+    shuffled shoe; a reshuffle just resets the counts. The unshuffled
+    shoe deals n_decks Decks stacked. Cards are looked up from
+    CARD_TABLE only when dealt.
+
+    A Shoe is not a Deck: it has no list of Card objects, and cards are
+    only returned to it by shuffling.
+
+    Instance Attributes
+    -------------------
+    n_decks: int
+        the number of decks in the shoe
+    size: int
+        the total number of cards, n_decks * 52
+    dealt: int
+        how many cards have been dealt since the last reshuffle
+    penetration: float
+        the fraction of the shoe dealt before the cut card comes out
+    cut_position: int
+        needs_shuffle() turns True once this many cards are dealt
+    dealt_counts: list
+        per card index, how many copies have been dealt
+    discarded: int
+        cards handed back with replace_card since the last reshuffle
+    rng: random.Random
+        the source of the shuffle
+    shuffled: bool
+        False until shuffle() is called; an unshuffled shoe deals from
+        the top of the stacked decks
+    '''
+
+    def __init__(self, n_decks=6, penetration=0.75, seed=None):
+        self.n_decks = n_decks
+        self.size = n_decks * DECK_SIZE
+        self.penetration = penetration
+        self.cut_position = int(self.size * penetration)
+        self.rng = random.Random(seed)
+        self.sort_cards()
+
+    def sort_cards(self):
+        '''returns every card to the shoe, unshuffled'''
+        self.shuffled = False
+        self.dealt = 0
+        self.discarded = 0
+        self.dealt_counts = [0] * DECK_SIZE
+
+    def shuffle(self):
+        '''returns every card to the shoe and starts a new random order
+
+        No order is drawn up front; deal_card() samples each card from
+        the remaining counts as it is dealt.
+        '''
+        self.shuffled = True
+        self.dealt = 0
+        self.discarded = 0
+        self.dealt_counts = [0] * DECK_SIZE
+
+    reshuffle = shuffle
+
+    def needs_shuffle(self):
+        '''returns True once the cut card has been reached'''
+        return self.dealt >= self.cut_position
+
+    def remaining(self):
+        '''returns the number of cards left in the shoe'''
+        return self.size - self.dealt
+
+    def __len__(self):
+        return self.remaining()
+
+    def has_card(self, card):
+        '''returns True if at least one copy of the card is still in the shoe'''
+        return card.is_standard() and self.dealt_counts[card.to_index()] < self.n_decks
+
+    def deal_card(self, i=-1):
+        '''deals the top card of the shoe
+
+        Parameters
+        -------------------
+        i: int (optional)
+            only -1 (the top card) is supported
+        Returns
+        -------
+        Card
+            the shared Card from CARD_TABLE
+        '''
+        if i != -1:
+            raise ValueError("a shoe can only deal from the top")
+        dealt = self.dealt
+        if dealt >= self.size:
+            raise IndexError("deal from empty shoe")
+        if self.shuffled:
+            # a uniform pick among the undealt copies: card i has
+            # n_decks - dealt_counts[i] of them left
+            pick = self.rng.randrange(self.size - dealt)
+            n_decks = self.n_decks
+            for index, count in enumerate(self.dealt_counts):
+                pick -= n_decks - count
+                if pick < 0:
+                    break
+        else:
+            index = DECK_SIZE - 1 - dealt % DECK_SIZE
+        self.dealt = dealt + 1
+        self.dealt_counts[index] += 1
+        return CARD_TABLE[index]
+
+    def take_top(self, count):
+        '''deals the top count cards, top card first'''
+        if count > self.remaining():
+            raise IndexError("deal from empty shoe")
+        return [self.deal_card() for _ in range(max(count, 0))]
+
+    def deal_hand(self, hand_size):
+        '''deals hand_size cards, top card first'''
+        return self.take_top(hand_size)
+
+    def deal_hands(self, n_players, hand_size, order="round_robin"):
+        '''deals hand_size cards to each of n_players, see Deck.deal_hands'''
+        if order not in DEAL_ORDERS:
+            raise ValueError(f"order must be one of {DEAL_ORDERS}, not {order!r}")
+        return split_hands(self.take_top(n_players * hand_size), n_players, hand_size, order)
+
+    def replace_card(self, card):
+        '''puts a played card in the discard tray
+
+        As at a casino table, discards stay out of play until the next
+        shuffle; only the discarded count changes.
+        '''
+        self.discarded += 1
+
 
 def print_hand(hand):
     '''prints a hand in a compact form
@@ -141,12 +600,58 @@ def print_hand(hand):
     -------
     none
     '''
-    hand_str = '/ '
-    for c in hand:
-        s = c.suit_name[0]
-        r = c.rank_name[0]
-        hand_str += r + "of" + s + ' / '
-    print(hand_str)
+    print(format_hand(hand))
+
+
+def format_hand(hand):
+    '''returns the compact form of a hand printed by print_hand
+
+    Parameters
+    -------------------
+    hand: list
+        list of Cards or integer-encoded cards (ints or NumPy integers)
+    Returns
+    -------
+    string
+        e.g. "/ QofC / 1ofD / "
+    '''
+    return "/ " + "".join([hand_token(c) for c in hand])
+
+
+def hand_token(card):
+    '''returns one card's part of format_hand, e.g. "QofC / "
+
+    Standard cards come from HAND_TOKENS; a Card outside the standard
+    52 is formatted from its names as print_hand always did. An integer
+    card must be an encoding 0-51; bools are rejected.
+    '''
+    if isinstance(card, numbers.Integral):
+        index = operator.index(card)
+        if isinstance(card, bool) or not 0 <= index < DECK_SIZE:
+            raise ValueError(f"not an encoded card: {card!r}")
+        return HAND_TOKENS[index]
+    if 0 <= card.suit < SUIT_COUNT and 1 <= card.rank <= RANK_COUNT:
+        return HAND_TOKENS[card.suit * RANK_COUNT + card.rank - 1]
+    return card.rank_name[0] + "of" + card.suit_name[0] + " / "
+
+
+def write_hands(hands, stream=None):
+    '''writes many hands, one format_hand line each, with a single call
+    to the stream instead of one print per hand
+
+    Parameters
+    -------------------
+    hands: iterable
+        hands of Cards or integer-encoded cards; may be a generator
+    stream: file object (optional)
+        a text stream such as an open file. Defaults to sys.stdout.
+    Returns
+    -------
+    none
+    '''
+    if stream is None:
+        stream = sys.stdout
+    stream.writelines(format_hand(hand) + "\n" for hand in hands)
 
 if __name__ == "__main__":
     print("test")
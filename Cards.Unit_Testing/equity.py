@@ -0,0 +1,203 @@
+'''Monte Carlo equity calculator for poker hands
+
+Deals random boards from a CompactDeck holding the unseen cards and
+scores every player's hand with poker.evaluate_indices. Trials are
+split into chunks that run on a ProcessPoolExecutor; each chunk has its
+own seed derived from the run seed, so a seeded run gives the same
+result whatever the number of workers.
+'''
+import math
+import numbers
+import operator
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cards
+import poker
+
+BOARD_SIZE = 5
+Z_95 = 1.96
+
+
+def to_indices(hand):
+    '''returns a list of encoded cards from Cards or ints (NumPy ints too)'''
+    return [operator.index(c) if isinstance(c, numbers.Integral) else c.to_index() for c in hand]
+
+
+def run_trials(hands, board, trials, seed):
+    '''plays out trials random boards for the given hands
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Parameters
+    ----------
+    hands: list
+        each player's hole cards, encoded
+    board: list
+        the encoded cards already on the board
+    trials: int
+        the number of boards to deal
+    seed: string
+        seed for this chunk's random.Random
+
+    Returns
+    -------
+    tuple
+        (wins, equity_sums, equity_square_sums), one entry per player.
+        A tie splits the trial's equity between the tied players.
+    '''
+    rng = random.Random(seed)
+    deck = cards.CompactDeck()
+    known = cards.mask_of(board + [i for hand in hands for i in hand])
+    deck.cards = bytearray(i for i in deck.cards if not known >> i & 1)
+    deck.reindex()
+    need = BOARD_SIZE - len(board)
+    n_players = len(hands)
+    wins = [0] * n_players
+    sums = [0.0] * n_players
+    squares = [0.0] * n_players
+    evaluate = poker.evaluate_indices
+    for _ in range(trials):
+        full_board = board + rng.sample(deck.cards, need)
+        scores = [evaluate(hand + full_board) for hand in hands]
+        best = max(scores)
+        winners = [p for p in range(n_players) if scores[p] == best]
+        share = 1.0 / len(winners)
+        if len(winners) == 1:
+            wins[winners[0]] += 1
+        for p in winners:
+            sums[p] += share
+            squares[p] += share * share
+    return wins, sums, squares
+
+
+class EquityResult:
+    '''the merged outcome of an equity run
+
+    Instance Attributes
+    -------------------
+    trials: int
+        the number of boards dealt
+    wins: list
+        outright wins per player
+    equity_sums: list
+        summed per-trial equity per player (ties are split)
+    equity_square_sums: list
+        summed squared per-trial equity, used for the confidence interval
+    stopped_early: bool
+        True if the run stopped because target_ci was reached
+    '''
+
+    def __init__(self, n_players):
+        self.trials = 0
+        self.wins = [0] * n_players
+        self.equity_sums = [0.0] * n_players
+        self.equity_square_sums = [0.0] * n_players
+        self.stopped_early = False
+
+    def merge(self, trials, chunk):
+        '''adds the output of one run_trials call'''
+        wins, sums, squares = chunk
+        self.trials += trials
+        for p in range(len(wins)):
+            self.wins[p] += wins[p]
+            self.equity_sums[p] += sums[p]
+            self.equity_square_sums[p] += squares[p]
+
+    def equities(self):
+        '''returns each player's estimated equity (0-1), nan before any trials'''
+        if self.trials == 0:
+            return [math.nan] * len(self.equity_sums)
+        return [s / self.trials for s in self.equity_sums]
+
+    def half_widths(self):
+        '''returns the half-width of each player's 95% confidence interval,
+        inf before any trials
+        '''
+        if self.trials == 0:
+            return [math.inf] * len(self.equity_sums)
+        widths = []
+        for s, sq in zip(self.equity_sums, self.equity_square_sums):
+            mean = s / self.trials
+            variance = max(sq / self.trials - mean * mean, 0.0)
+            widths.append(Z_95 * math.sqrt(variance / self.trials))
+        return widths
+
+
+def estimate_equity(hands, board=(), trials=100000, workers=None, seed=None,
+                    target_ci=None, chunk_trials=2000):
+    '''estimates each player's equity by dealing random boards
+
+    Parameters
+    ----------
+    hands: list
+        each player's hole cards, as Cards or encoded ints
+    board: list (optional)
+        cards already on the board, 0-5 of them
+    trials: int (optional)
+        the maximum number of boards to deal
+    workers: int (optional)
+        worker processes. None uses os.cpu_count(); 1 runs in this process.
+    seed: int or string (optional)
+        makes the run reproducible. None picks a random seed.
+    target_ci: float (optional)
+        stop once every player's 95% confidence half-width is at or below
+        this (e.g. 0.005 for +/- 0.5%). Checked after each chunk.
+    chunk_trials: int (optional)
+        trials per chunk of work handed to a worker
+
+    Returns
+    -------
+    EquityResult
+        the merged counts of the chunks used. Chunks are merged in chunk
+        order, so a seeded run gives bit-for-bit the same result (and,
+        with target_ci, stops after the same chunk) for any number of
+        workers.
+    '''
+    if trials < 1:
+        raise ValueError(f"trials must be at least 1, not {trials}")
+    hands = [to_indices(hand) for hand in hands]
+    board = to_indices(board)
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    workers = workers or os.cpu_count() or 1
+    chunks = [min(chunk_trials, trials - start) for start in range(0, trials, chunk_trials)]
+    result = EquityResult(len(hands))
+
+    def done():
+        return (target_ci is not None and result.trials > 0
+                and max(result.half_widths()) <= target_ci)
+
+    if workers == 1:
+        for k, size in enumerate(chunks):
+            result.merge(size, run_trials(hands, board, size, f"{seed}:{k}"))
+            if done():
+                result.stopped_early = k + 1 < len(chunks)
+                break
+        return result
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = {}
+        finished_chunks = {} # chunk number -> output, waiting for earlier chunks
+        next_chunk = 0
+        next_merge = 0
+        while next_merge < len(chunks):
+            # keep two chunks queued per worker so none sit idle
+            while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                future = pool.submit(run_trials, hands, board, chunks[next_chunk], f"{seed}:{next_chunk}")
+                pending[future] = next_chunk
+                next_chunk += 1
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                finished_chunks[pending.pop(future)] = future.result()
+            # merge in chunk order, so float sums do not depend on timing
+            while next_merge in finished_chunks:
+                result.merge(chunks[next_merge], finished_chunks.pop(next_merge))
+                next_merge += 1
+                if done():
+                    result.stopped_early = next_merge < len(chunks)
+                    for future in pending:
+                        future.cancel()
+                    return result
+    return result
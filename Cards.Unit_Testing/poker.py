@@ -0,0 +1,278 @@
+'''Poker hand evaluation for cards.py
+
+Scores 5-, 6- and 7-card hands with lookup tables built once at import.
+A score is an int from 1 (worst 7-5-4-3-2 high card) to 7462 (royal
+flush); higher always beats lower and equal scores tie.
+
+Cards can be Card objects or their integer encoding (cards.card_index),
+so hands dealt from a Deck or a CompactDeck both work.
+
+Tables
+------
+FLUSH_TABLE: the score of the best flush or straight flush in a 13-bit
+    mask of ranks from one suit (0 if the mask has fewer than 5 ranks).
+PRODUCT_TABLE: the score of the best non-flush hand, keyed by the
+    product of one prime per card rank (the product identifies the rank
+    multiset regardless of order).
+
+Building the tables takes about a second, so they are saved to
+TABLE_CACHE_FILENAME the first time and loaded from there afterwards.
+'''
+import bisect
+import json
+import numbers
+import operator
+import os
+from array import array
+from collections import Counter
+from itertools import combinations_with_replacement
+
+import cards
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAND_CLASSES = ["High Card", "Pair", "Two Pair", "Three of a Kind", "Straight",
+                "Flush", "Full House", "Four of a Kind", "Straight Flush"]
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+
+# poker values run 0 (deuce) to 12 (ace)
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+
+# per card index: the card's value bit, its prime and its suit
+RANK_BIT = [1 << ((i - 1) % cards.RANK_COUNT) for i in range(cards.DECK_SIZE)]
+RANK_PRIME = [PRIMES[(i - 1) % cards.RANK_COUNT] for i in range(cards.DECK_SIZE)]
+SUIT_OF = [cards.index_suit(i) for i in range(cards.DECK_SIZE)]
+
+# (rank mask, top value) for every straight, best first; the wheel is A-2-3-4-5
+STRAIGHTS = [(0b11111 << low, low + 4) for low in range(8, -1, -1)] + [(0b1000000001111, 3)]
+
+
+def best_straight(mask):
+    '''returns the top value of the best straight in a rank mask, or -1'''
+    for straight, top in STRAIGHTS:
+        if mask & straight == straight:
+            return top
+    return -1
+
+
+def flush_key(mask):
+    '''returns the sort key of the best hand made from one suit's rank mask'''
+    top = best_straight(mask)
+    if top >= 0:
+        return (STRAIGHT_FLUSH, top)
+    values = [v for v in range(12, -1, -1) if mask >> v & 1]
+    return (FLUSH,) + tuple(values[:5])
+
+
+def rank_key(values):
+    '''returns the sort key of the best non-flush hand from 5-7 card values
+
+    Parameters
+    ----------
+    values: iterable of int
+        the poker values (0-12) of the cards, repeats allowed
+
+    Returns
+    -------
+    tuple
+        (hand class, tie breakers...), comparable between hands
+    '''
+    counts = Counter(values)
+    # values ordered by how many of them there are, then by value
+    groups = sorted(counts, key=lambda v: (counts[v], v), reverse=True)
+    singles = sorted(counts, reverse=True)
+    first = counts[groups[0]]
+    if first == 4:
+        return (QUADS, groups[0], max(v for v in singles if v != groups[0]))
+    if first == 3 and counts[groups[1]] >= 2:
+        return (FULL_HOUSE, groups[0], groups[1])
+    mask = 0
+    for v in counts:
+        mask |= 1 << v
+    top = best_straight(mask)
+    if top >= 0:
+        return (STRAIGHT, top)
+    if first == 3:
+        return (TRIPS, groups[0]) + tuple(v for v in singles if v != groups[0])[:2]
+    if first == 2 and counts[groups[1]] == 2:
+        high, low = groups[0], groups[1]
+        return (TWO_PAIR, high, low, max(v for v in singles if v not in (high, low)))
+    if first == 2:
+        return (PAIR, groups[0]) + tuple(v for v in singles if v != groups[0])[:3]
+    return (HIGH_CARD,) + tuple(singles[:5])
+
+
+def build_tables():
+    '''builds FLUSH_TABLE, PRODUCT_TABLE and the class boundaries
+
+    Every distinct 5-card hand class is ranked once; the 6- and 7-card
+    entries map to the score of their best 5-card class.
+
+    Returns
+    -------
+    tuple
+        (FLUSH_TABLE, PRODUCT_TABLE, CLASS_STARTS)
+    '''
+    five_keys = set()
+    for values in combinations_with_replacement(range(13), 5):
+        if max(values.count(v) for v in values) <= 4:
+            five_keys.add(rank_key(values))
+            if len(set(values)) == 5:
+                five_keys.add(flush_key(sum(1 << v for v in values)))
+    ordered = sorted(five_keys)
+    score = {key: n + 1 for n, key in enumerate(ordered)}
+    class_starts = [score[min(k for k in ordered if k[0] == c)] for c in range(9)]
+
+    flush_table = array('H', bytes(2 << 13))
+    for mask in range(1 << 13):
+        if bin(mask).count("1") >= 5:
+            flush_table[mask] = score[flush_key(mask)]
+
+    product_table = {}
+    for size in (5, 6, 7):
+        for values in combinations_with_replacement(range(13), size):
+            if max(values.count(v) for v in values) <= 4:
+                product = 1
+                for v in values:
+                    product *= PRIMES[v]
+                product_table[product] = score[rank_key(values)]
+    return flush_table, product_table, class_starts
+
+
+TABLE_CACHE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "poker_tables.json")
+TABLE_VERSION = 1
+
+
+def save_tables(tables, filename=TABLE_CACHE_FILENAME):
+    '''saves the tables returned by build_tables to a JSON file'''
+    flush_table, product_table, class_starts = tables
+    products = sorted(product_table)
+    dumped = json.dumps({
+        "version": TABLE_VERSION,
+        "flush": flush_table.tolist(),
+        "products": products,
+        "scores": [product_table[p] for p in products],
+        "class_starts": class_starts,
+    })
+    with open(filename, "w") as fw:
+        fw.write(dumped)
+
+
+def load_tables(filename=TABLE_CACHE_FILENAME):
+    '''loads the tables from the cache file, building and saving them if
+    the file is missing, unreadable or from another table version
+
+    Returns
+    -------
+    tuple
+        (FLUSH_TABLE, PRODUCT_TABLE, CLASS_STARTS)
+    '''
+    try:
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if data["version"] == TABLE_VERSION:
+            return (array('H', data["flush"]),
+                    dict(zip(data["products"], data["scores"])),
+                    data["class_starts"])
+    except (OSError, ValueError, KeyError):
+        pass
+    tables = build_tables()
+    try:
+        save_tables(tables, filename)
+    except OSError:
+        pass # read-only install, rebuild next time
+    return tables
+
+
+FLUSH_TABLE, PRODUCT_TABLE, CLASS_STARTS = load_tables()
+
+
+def evaluate_indices(indices):
+    '''scores 5-7 integer-encoded cards
+
+    Parameters
+    ----------
+    indices: sequence of int
+        the encoded cards (0-51), no repeats
+
+    Returns
+    -------
+    int
+        the hand score, 1-7462
+    '''
+    suit_masks = [0, 0, 0, 0]
+    product = 1
+    for i in indices:
+        suit_masks[SUIT_OF[i]] |= RANK_BIT[i]
+        product *= RANK_PRIME[i]
+    # with at most 7 cards a flush rules out quads and full houses,
+    # so a flush score is always the best hand available
+    for mask in suit_masks:
+        if FLUSH_TABLE[mask]:
+            return FLUSH_TABLE[mask]
+    return PRODUCT_TABLE[product]
+
+
+def evaluate(hand):
+    '''scores a hand of 5-7 Cards or encoded cards
+
+    Parameters
+    ----------
+    hand: list
+        Cards (e.g. from Deck.deal_hand) or integer cards, including
+        NumPy integers (e.g. from CompactDeck.deal_hand or a
+        batch_shuffle row)
+
+    Returns
+    -------
+    int
+        the hand score, 1-7462. Higher is better.
+    '''
+    return evaluate_indices([operator.index(c) if isinstance(c, numbers.Integral) else c.to_index()
+                             for c in hand])
+
+
+def hand_class(score):
+    '''returns the name of the hand class of a score, e.g. "Full House"'''
+    return HAND_CLASSES[bisect.bisect_right(CLASS_STARTS, score) - 1]
+
+
+if np is not None:
+    FLUSH_ARRAY = np.array(FLUSH_TABLE, dtype=np.uint16)
+    PRODUCT_KEYS = np.array(sorted(PRODUCT_TABLE), dtype=np.int64)
+    PRODUCT_SCORES = np.array([PRODUCT_TABLE[p] for p in PRODUCT_KEYS.tolist()], dtype=np.uint16)
+    RANK_BIT_ARRAY = np.array(RANK_BIT, dtype=np.uint16)
+    RANK_PRIME_ARRAY = np.array(RANK_PRIME, dtype=np.int64)
+    SUIT_ARRAY = np.array(SUIT_OF, dtype=np.uint8)
+
+
+def evaluate_batch(hands):
+    '''scores many hands of the same size at once
+
+    Parameters
+    ----------
+    hands: 2-D array-like of int
+        one row of 5-7 encoded cards per hand, e.g. rows sliced from
+        batch_shuffle.shuffled_decks
+
+    Returns
+    -------
+    numpy.ndarray or list
+        the score of each hand. Needs NumPy for the vectorized path;
+        without it the hands are scored one at a time into a list.
+    '''
+    if np is None:
+        return [evaluate_indices(hand) for hand in hands]
+    hands = np.asarray(hands, dtype=np.intp)
+    bits = RANK_BIT_ARRAY[hands]
+    suits = SUIT_ARRAY[hands]
+    product = RANK_PRIME_ARRAY[hands].prod(axis=1)
+    scores = PRODUCT_SCORES[np.searchsorted(PRODUCT_KEYS, product)]
+    for suit in range(cards.SUIT_COUNT):
+        mask = np.where(suits == suit, bits, 0).sum(axis=1)
+        flush = FLUSH_ARRAY[mask]
+        scores = np.where(flush > 0, flush, scores)
+    return scores
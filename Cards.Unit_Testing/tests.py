@@ -1,5 +1,14 @@
+import io
 import unittest
 import cards as hw5_cards
+import poker
+import equity
+
+try:
+    import numpy
+    import batch_shuffle
+except ImportError:
+    numpy = None
 
 class TestCard(unittest.TestCase):
 
@@ -174,5 +183,337 @@ class TestCard(unittest.TestCase):
 
         return len(q8.cards),before
 
+
+class TestMembership(unittest.TestCase):
+
+    def test_mask_follows_deals(self):
+        deck = hw5_cards.Deck()
+        deck.shuffle()
+        top = deck.cards[-1]
+        self.assertTrue(deck.has_card(top))
+        deck.deal_card()
+        self.assertFalse(deck.has_card(top))
+        hand = deck.deal_hand(5)
+        for c in hand:
+            self.assertFalse(deck.has_card(c))
+        deck.reindex()
+        self.assertEqual(deck.card_mask, hw5_cards.mask_of(c.to_index() for c in deck.cards))
+        deck.sort_cards()
+        self.assertEqual(deck.card_mask, hw5_cards.FULL_MASK)
+
+    def test_replace_equal_card(self):
+        deck = hw5_cards.Deck()
+        dealt = deck.deal_card()
+        deck.replace_card(hw5_cards.Card(dealt.suit, dealt.rank))
+        deck.replace_card(dealt)
+        self.assertEqual(len(deck.cards), 52)
+        self.assertTrue(deck.has_card(dealt))
+
+    def test_replace_nonstandard_card(self):
+        deck = hw5_cards.Deck()
+        for card in [hw5_cards.Card(0, 14), hw5_cards.Card(0, 0)]:
+            self.assertFalse(deck.has_card(card))
+            deck.replace_card(card)
+            deck.replace_card(card)
+            self.assertTrue(deck.has_card(card))
+        self.assertEqual(len(deck.cards), 54)
+        self.assertEqual(deck.card_mask, hw5_cards.FULL_MASK)
+        self.assertEqual(str(deck.deal_card()), "0 of Diamonds")
+        self.assertEqual(deck.card_mask, hw5_cards.FULL_MASK)
+        self.assertFalse(hw5_cards.Shoe(1).has_card(hw5_cards.Card(0, 0)))
+
+    def test_compact_mask(self):
+        compact = hw5_cards.CompactDeck()
+        compact.shuffle()
+        hand = compact.deal_hand(3)
+        for i in hand:
+            self.assertFalse(compact.has_card(i))
+        compact.replace_card(hand[0])
+        self.assertTrue(compact.has_card(hand[0]))
+        self.assertEqual(hw5_cards.CompactDeck.from_deck(compact.to_deck()).card_mask,
+                         compact.card_mask)
+
+class TestCanonicalOrder(unittest.TestCase):
+
+    def test_sort_restores_in_place(self):
+        deck = hw5_cards.Deck()
+        cards_list = deck.cards
+        deck.shuffle()
+        deck.deal_hand(10)
+        deck.sort_cards()
+        self.assertIs(deck.cards, cards_list)
+        self.assertEqual([c.to_index() for c in deck.cards], list(range(52)))
+
+    def test_decks_do_not_share_lists(self):
+        a = hw5_cards.Deck()
+        b = hw5_cards.Deck()
+        a.deal_card()
+        self.assertEqual(len(b.cards), 52)
+        c = hw5_cards.CompactDeck()
+        c.deal_card()
+        self.assertEqual(hw5_cards.CompactDeck().cards, hw5_cards.CANONICAL_BYTES)
+
+    def test_shared_cards_are_immutable(self):
+        deck = hw5_cards.Deck()
+        with self.assertRaises(AttributeError):
+            deck.cards[0].rank = 5
+        self.assertEqual(hw5_cards.Deck().cards[0].rank, 1)
+        self.assertIsInstance(deck.cards[0], hw5_cards.Card)
+        card = hw5_cards.Card(0, 1)
+        card.rank = 5
+        self.assertEqual(card.rank, 5)
+
+class TestDealHands(unittest.TestCase):
+
+    def test_round_robin(self):
+        deck = hw5_cards.Deck()
+        deck.shuffle()
+        top = deck.cards[::-1]
+        hands = deck.deal_hands(4, 5)
+        self.assertEqual(len(hands), 4)
+        for p, hand in enumerate(hands):
+            self.assertEqual(hand, [top[p + 4 * k] for k in range(5)])
+            for c in hand:
+                self.assertFalse(deck.has_card(c))
+        self.assertEqual(len(deck.cards), 32)
+
+    def test_block_matches_deal_hand(self):
+        deck = hw5_cards.Deck()
+        deck.shuffle()
+        other = hw5_cards.Deck()
+        other.cards = list(deck.cards)
+        hands = deck.deal_hands(3, 5, order="block")
+        self.assertEqual(hands[0], other.deal_hand(5))
+        self.assertEqual(hands[1], other.deal_hand(5))
+
+    def test_compact_and_errors(self):
+        compact = hw5_cards.CompactDeck()
+        hands = compact.deal_hands(2, 2)
+        self.assertEqual([list(h) for h in hands], [[51, 49], [50, 48]])
+        self.assertRaises(IndexError, compact.deal_hands, 7, 7)
+        self.assertRaises(ValueError, compact.deal_hands, 2, 2, "spiral")
+        self.assertEqual(hw5_cards.Deck().deal_hand(0), [])
+
+class TestFormatting(unittest.TestCase):
+
+    def test_names_match_str(self):
+        for i, c in enumerate(hw5_cards.CARD_TABLE):
+            self.assertEqual(hw5_cards.CARD_NAMES[i], f"{c.rank_name} of {c.suit_name}")
+            self.assertEqual(str(hw5_cards.Card(c.suit, c.rank)), hw5_cards.CARD_NAMES[i])
+
+    def test_format_hand(self):
+        hand = [hw5_cards.Card(1, 12), hw5_cards.Card(0, 10)]
+        self.assertEqual(hw5_cards.format_hand(hand), "/ QofC / 1ofD / ")
+        self.assertEqual(hw5_cards.format_hand([c.to_index() for c in hand]), "/ QofC / 1ofD / ")
+        self.assertEqual(hw5_cards.format_hand([]), "/ ")
+
+    def test_format_nonstandard_and_numpy_cards(self):
+        self.assertEqual(hw5_cards.format_hand([hw5_cards.Card(0, 14)]), "/ 1ofD / ")
+        if numpy is not None:
+            row = numpy.array([24, 9], dtype=numpy.uint8)
+            self.assertEqual(hw5_cards.format_hand(row), "/ QofC / 1ofD / ")
+        for bad in [-1, 52, True]:
+            self.assertRaises(ValueError, hw5_cards.format_hand, [bad])
+
+    def test_write_hands(self):
+        deck = hw5_cards.CompactDeck()
+        stream = io.StringIO()
+        hw5_cards.write_hands((deck.deal_hand(2) for _ in range(3)), stream)
+        self.assertEqual(stream.getvalue().splitlines(),
+                         ["/ KofS / QofS / ", "/ JofS / 1ofS / ", "/ 9ofS / 8ofS / "])
+
+class TestShoe(unittest.TestCase):
+
+    def test_each_card_n_times(self):
+        shoe = hw5_cards.Shoe(6, seed=3)
+        shoe.shuffle()
+        counts = {}
+        for c in shoe.deal_hand(312):
+            counts[c.to_index()] = counts.get(c.to_index(), 0) + 1
+        self.assertEqual(set(counts.values()), {6})
+        self.assertEqual(len(counts), 52)
+        self.assertRaises(IndexError, shoe.deal_card)
+
+    def test_unshuffled_matches_stacked_decks(self):
+        shoe = hw5_cards.Shoe(2)
+        deck = hw5_cards.Deck()
+        self.assertEqual(shoe.deal_hand(52), deck.deal_hand(52))
+        self.assertTrue(shoe.has_card(hw5_cards.Card(3, 13)))
+
+    def test_memory_does_not_grow_with_decks(self):
+        shoe = hw5_cards.Shoe(1000, seed=1)
+        shoe.shuffle()
+        self.assertEqual(len(shoe.deal_hand(500)), 500)
+        sizes = [len(v) for v in vars(shoe).values() if hasattr(v, "__len__")]
+        self.assertLessEqual(max(sizes), hw5_cards.DECK_SIZE)
+
+    def test_seeded_and_cut_card(self):
+        a = hw5_cards.Shoe(8, penetration=0.5, seed="table 1")
+        b = hw5_cards.Shoe(8, penetration=0.5, seed="table 1")
+        a.shuffle()
+        b.shuffle()
+        self.assertEqual(a.deal_hands(4, 2), b.deal_hands(4, 2))
+        self.assertFalse(a.needs_shuffle())
+        a.deal_hand(a.cut_position - a.dealt)
+        self.assertTrue(a.needs_shuffle())
+        a.reshuffle()
+        self.assertEqual(a.remaining(), 8 * 52)
+        card = a.deal_card()
+        a.replace_card(card)
+        self.assertEqual(a.discarded, 1)
+        self.assertEqual(a.remaining(), 8 * 52 - 1)
+
+    def test_shuffle_is_uniform(self):
+        # chi-squared of the first card over 52 cells, 51 degrees of
+        # freedom; 90 is above the 99.9th percentile
+        shoe = hw5_cards.Shoe(1, seed="uniform")
+        first = [0] * 52
+        adjacent = 0
+        trials = 20000
+        for _ in range(trials):
+            shoe.shuffle()
+            a, b = shoe.deal_hand(2)
+            first[a.to_index()] += 1
+            adjacent += abs(a.to_index() - b.to_index()) == 1
+        expected = trials / 52
+        chi2 = sum((n - expected) ** 2 / expected for n in first)
+        self.assertLess(chi2, 90)
+        # P(second card is one index away from the first) = 102 / 2652
+        self.assertAlmostEqual(adjacent / trials, 102 / 2652, delta=0.006)
+
+class TestCompactDeck(unittest.TestCase):
+
+    def test_index_round_trip(self):
+        for i in range(52):
+            c = hw5_cards.Card.from_index(i)
+            self.assertEqual(c.to_index(), i)
+            self.assertEqual(hw5_cards.suit_name_of(i), c.suit_name)
+            self.assertEqual(hw5_cards.rank_name_of(i), c.rank_name)
+        self.assertEqual(str(hw5_cards.CARD_TABLE[51]), "King of Spades")
+
+    def test_matches_deck_order(self):
+        deck = hw5_cards.Deck()
+        compact = hw5_cards.CompactDeck()
+        self.assertEqual(len(compact.cards), 52)
+        self.assertEqual([str(c) for c in deck.cards],
+                         [str(c) for c in compact.to_deck().cards])
+
+    def test_deal_and_replace(self):
+        compact = hw5_cards.CompactDeck()
+        top = compact.deal_card()
+        self.assertEqual(top, 51)
+        self.assertEqual(len(compact.cards), 51)
+        compact.replace_card(top)
+        compact.replace_card(top)
+        self.assertEqual(len(compact.cards), 52)
+
+    def test_deal_hand(self):
+        deck = hw5_cards.Deck()
+        deck.shuffle()
+        compact = hw5_cards.CompactDeck.from_deck(deck)
+        hand = compact.deal_hand(5)
+        self.assertEqual(list(hand), [c.to_index() for c in deck.deal_hand(5)])
+        self.assertEqual(len(compact.cards), 47)
+        self.assertRaises(IndexError, compact.deal_hand, 48)
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestBatchShuffle(unittest.TestCase):
+
+    def test_rows_are_permutations(self):
+        rows = batch_shuffle.BatchShuffler(seed=7, batch_size=50).batch(0)
+        self.assertEqual(rows.shape, (50, 52))
+        self.assertTrue((numpy.sort(rows, axis=1) == numpy.arange(52)).all())
+
+    def test_reproducible(self):
+        a = batch_shuffle.BatchShuffler(seed=7, batch_size=10)
+        b = batch_shuffle.BatchShuffler(seed=7, batch_size=10)
+        self.assertTrue((a.batch(3) == b.batch(3)).all())
+        self.assertFalse((a.batch(0) == a.batch(1)).all())
+        total = sum(len(rows) for rows in a.batches(25))
+        self.assertEqual(total, 25)
+
+    def test_round_trip(self):
+        rows = batch_shuffle.BatchShuffler(seed=1, batch_size=2).batch(0)
+        deck = batch_shuffle.row_to_deck(rows[0])
+        compact = batch_shuffle.row_to_compact_deck(rows[1])
+        self.assertEqual(deck.card_mask, hw5_cards.FULL_MASK)
+        self.assertEqual(str(deck.deal_card()), str(hw5_cards.CARD_TABLE[rows[0, -1]]))
+        compact.replace_card(0)
+        self.assertEqual(len(compact.cards), 52)
+        self.assertTrue((batch_shuffle.decks_to_rows([batch_shuffle.row_to_deck(rows[1]),
+                                                      batch_shuffle.row_to_compact_deck(rows[1])])
+                         == rows[1]).all())
+
+class TestPoker(unittest.TestCase):
+
+    def hand(self, *pairs):
+        return [hw5_cards.Card(suit, rank) for suit, rank in pairs]
+
+    def test_hand_classes(self):
+        royal = self.hand((3, 1), (3, 13), (3, 12), (3, 11), (3, 10))
+        wheel = self.hand((0, 1), (1, 2), (2, 3), (3, 4), (0, 5))
+        boat = self.hand((0, 9), (1, 9), (2, 9), (0, 4), (1, 4))
+        worst = self.hand((0, 7), (1, 5), (2, 4), (3, 3), (0, 2))
+        self.assertEqual(poker.evaluate(royal), 7462)
+        self.assertEqual(poker.evaluate(worst), 1)
+        self.assertEqual(poker.hand_class(poker.evaluate(wheel)), "Straight")
+        self.assertEqual(poker.hand_class(poker.evaluate(boat)), "Full House")
+        self.assertGreater(poker.evaluate(boat), poker.evaluate(wheel))
+
+    def test_seven_cards_pick_best_five(self):
+        seven = self.hand((0, 1), (0, 13), (1, 13), (2, 13), (0, 2), (0, 3), (0, 4))
+        best = self.hand((0, 1), (0, 13), (0, 2), (0, 3), (0, 4))
+        self.assertEqual(poker.evaluate(seven), poker.evaluate(best))
+        self.assertEqual(poker.hand_class(poker.evaluate(seven)), "Flush")
+
+    def test_compact_and_batch(self):
+        compact = hw5_cards.CompactDeck()
+        compact.shuffle()
+        hands = compact.deal_hands(7, 7)
+        scores = [poker.evaluate(list(h)) for h in hands]
+        self.assertEqual(list(poker.evaluate_batch([list(h) for h in hands])), scores)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_integer_cards(self):
+        row = numpy.arange(7, dtype=numpy.uint8)
+        self.assertEqual(poker.evaluate(row), poker.evaluate(list(range(7))))
+
+class TestEquity(unittest.TestCase):
+
+    def test_dominated_hand(self):
+        aces = [hw5_cards.Card(0, 1), hw5_cards.Card(1, 1)]
+        kings = [hw5_cards.Card(2, 13), hw5_cards.Card(3, 13)]
+        result = equity.estimate_equity([aces, kings], trials=3000, workers=1, seed=1)
+        self.assertEqual(result.trials, 3000)
+        self.assertAlmostEqual(sum(result.equities()), 1.0)
+        self.assertGreater(result.equities()[0], 0.75)
+
+    def test_seeded_runs_match_across_workers(self):
+        hands = [[0, 1], [13, 14]]
+        board = [26, 27, 40]
+        one = equity.estimate_equity(hands, board, trials=1000, workers=1, seed="s", chunk_trials=250)
+        two = equity.estimate_equity(hands, board, trials=1000, workers=2, seed="s", chunk_trials=250)
+        self.assertEqual(one.wins, two.wins)
+        self.assertEqual(one.equity_sums, two.equity_sums)
+
+    def test_three_way_ties_match_across_workers(self):
+        hands = [[1, 15], [2, 16], [3, 17]]
+        board = [12, 25, 38, 11] # three kings and a queen: mostly 3-way ties
+        one = equity.estimate_equity(hands, board, trials=30000, workers=1, seed=7, chunk_trials=500)
+        three = equity.estimate_equity(hands, board, trials=30000, workers=3, seed=7, chunk_trials=500)
+        self.assertEqual(one.equity_sums, three.equity_sums)
+        self.assertEqual(one.equity_square_sums, three.equity_square_sums)
+
+    def test_no_trials(self):
+        self.assertRaises(ValueError, equity.estimate_equity, [[0, 1], [2, 3]], trials=0)
+        self.assertTrue(all(e != e for e in equity.EquityResult(2).equities()))
+
+    def test_stops_at_target(self):
+        result = equity.estimate_equity([[0, 13], [1, 2]], trials=100000, workers=1,
+                                        seed=2, target_ci=0.05, chunk_trials=500)
+        self.assertTrue(result.stopped_early)
+        self.assertLess(result.trials, 100000)
+        self.assertLessEqual(max(result.half_widths()), 0.05)
+
 if __name__=="__main__":
     unittest.main()
\ No newline at end of file
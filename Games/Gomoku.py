@@ -0,0 +1,147 @@
+'''N x N, K-in-a-row games (Gomoku is 15 x 15 with five in a row)
+
+Generalizes Tic_tac_toe.py to any square board. Instead of rescanning
+the whole board after every move, check_win_at only looks along the
+four lines through the cell that was just played, so a move costs
+O(K) however large the board is.
+'''
+from Tic_tac_toe import display_board, next_player, player_name
+
+# (row step, column step) for horizontal, vertical and both diagonals
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+def check_win_at(board, size, k, index):
+    '''checks whether the mark at index completes k in a row
+
+    Parameters
+    ----------
+    board: list
+        the playing board, size * size cells, row by row
+    size: int
+        the board width
+    k: int
+        how many in a row win
+    index: int
+        the cell that was just played
+
+    Returns
+    -------
+    int
+        the player ID at index if it makes a line, otherwise 0
+    '''
+    player = board[index]
+    if player == 0:
+        return 0
+    if k <= 1:
+        return player
+    row, col = divmod(index, size)
+    for d_row, d_col in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * d_row, col + sign * d_col
+            while 0 <= r < size and 0 <= c < size and board[r * size + c] == player:
+                count += 1
+                if count >= k:
+                    return player
+                r += sign * d_row
+                c += sign * d_col
+    return 0
+
+
+def check_win_full(board, size, k):
+    '''checks the whole board for k in a row by scanning every cell
+
+    The O(N**2 * K) reference that check_win_at avoids; returns the
+    first winner found in row-major order.
+
+    Returns
+    -------
+    int
+        the player ID of the winner. 0 means no winner found.
+    '''
+    for index in range(len(board)):
+        row, col = divmod(index, size)
+        player = board[index]
+        if player == 0:
+            continue
+        for d_row, d_col in DIRECTIONS:
+            end_row, end_col = row + (k - 1) * d_row, col + (k - 1) * d_col
+            if not (0 <= end_row < size and 0 <= end_col < size):
+                continue
+            if all(board[(row + j * d_row) * size + col + j * d_col] == player
+                   for j in range(1, k)):
+                return player
+    return 0
+
+
+class Game:
+    '''a game on a size x size board where k in a row wins
+
+    Attributes
+    ----------
+    size: int
+        the board width
+    k: int
+        how many in a row win
+    board: list
+        size * size cells, 0 for empty or a player ID
+    player: int
+        the player to move (1 = X goes first)
+    moves_left: int
+        empty cells remaining
+    winner: int
+        the winning player ID, 0 while nobody has won
+    '''
+
+    def __init__(self, size=15, k=5):
+        self.size = size
+        self.k = k
+        self.board = [0] * (size * size)
+        self.player = 1
+        self.moves_left = size * size
+        self.winner = 0
+
+    def is_over(self):
+        '''returns True once somebody has won or the board is full'''
+        return self.winner != 0 or self.moves_left == 0
+
+    def play(self, index):
+        '''marks a cell for the player to move and passes the turn
+
+        Parameters
+        ----------
+        index: int
+            the cell to mark, 0 .. size*size - 1
+
+        Returns
+        -------
+        int
+            the winner after this move, 0 if nobody has won yet
+        '''
+        if self.is_over():
+            raise ValueError("the game is over")
+        if not 0 <= index < len(self.board) or self.board[index] != 0:
+            raise ValueError("cell {} is not free".format(index + 1))
+        self.board[index] = self.player
+        self.moves_left -= 1
+        self.winner = check_win_at(self.board, self.size, self.k, index)
+        self.player = next_player(self.player)
+        return self.winner
+
+    def display(self):
+        '''prints the board using Tic_tac_toe.display_board'''
+        display_board(self.board, self.size)
+
+
+if __name__ == "__main__":
+    game = Game()
+    while not game.is_over():
+        game.display()
+        print("It's player {}'s turn.".format(player_name(game.player)))
+        try:
+            game.play(int(input("Please enter a number 1-{}:".format(len(game.board)))) - 1)
+        except ValueError as e:
+            print("Invalid move ({}), try again.".format(e))
+    game.display()
+    print("Game over!", player_name(game.winner), "wins the game!")
@@ -42,26 +42,46 @@ class Pet:
     ----------
     name : string
         The pet's name
+
+    Pets use __slots__, so instances carry only their own stats. Art,
+    play chances and the command table are class attributes shared by
+    every pet of a kind.
     '''
+    __slots__ = ('name', 'hunger', 'boredom', 'sound', 'age')
     max_boredom = 6
     max_hunger = 10
     leaves_hungry = 16
     leaves_bored = 12
-
+    leaves_age = 18
+    kind = 'pet'
+    # how much each clock_tick adds
+    hunger_per_tick = 2
+    boredom_per_tick = 2
+    age_per_tick = 0
+    ascii_art_left = DOG_LEFT
+    ascii_art_right = DOG_RIGHT
+    # guesses allowed in play()
+    play_chances = 3
+    # command word -> function(pet) returning the reply text or None;
+    # subclasses copy and extend this
+    commands = {
+        "speak": lambda pet: pet.speak(),
+        "play": lambda pet: pet.play(),
+        "feed": lambda pet: pet.feed(),
+        "wait": lambda pet: "Nothing to do...",
+    }
 
     def __init__(self, name, sound):
         self.name = name
         self.hunger = randrange(self.max_hunger)
         self.boredom = randrange(self.max_boredom)
         self.sound = sound
-        self.type = resp_pet_type.lower()
         self.age = 0
-        if self.type == 'cat':
-            self.ascii_art_left = CAT_LEFT
-            self.ascii_art_right = CAT_RIGHT
-        else:
-            self.ascii_art_left = DOG_LEFT
-            self.ascii_art_right = DOG_RIGHT
+
+    @property
+    def type(self):
+        '''the kind of pet, e.g. 'dog' (same as the class attribute kind)'''
+        return self.kind
 
     def mood(self):
         '''Get the mood of a pet. A pet can be happy, hungry or bored,
@@ -109,48 +129,34 @@ class Pet:
         Parameters
         ----------
         resp : string
-            The command to be issued to the pet.
+            The command to be issued to the pet. It is looked up in the
+            class's commands table.
 
         Returns
         -------
         none
         '''
-        resp = resp.lower()
-        if self.type == 'poodle':
-            if resp == "speak":
-                print(self.speak())
-            elif resp == "play":
-                self.play()
-            elif resp == "feed":
-                self.feed()
-            elif resp == "wait":
-                print("Poodles cannot wait, please provide avalid command.")
-            elif resp == 'dance':
-                print("Dancing in circles like poodles do!")
-            else:
-                print("Please provide a valid command.")
-        elif self.type == 'dog':
-            if resp == "speak":
-                print(self.speak())
-            elif resp == "play":
-                self.play()
-            elif resp == "feed":
-                self.feed()
-            elif resp == "wait":
-                print("Dogs cannot wait, please provide avalid command.")
-            else:
-                print("Please provide a valid command.")
-        else:
-            if resp == "speak":
-                print(self.speak())
-            elif resp == "play":
-                self.play()
-            elif resp == "feed":
-                self.feed()
-            elif resp == "wait":
-                print("Nothing to do...")
-            else:
-                print("Please provide a valid command.")
+        reply = self.command_reply(resp)
+        if reply:
+            print(reply)
+
+    def command_reply(self, resp):
+        '''Runs command "resp" like do_command, but returns the reply instead of printing it.
+
+        Parameters
+        ----------
+        resp : string
+            The command to be issued to the pet.
+
+        Returns
+        -------
+        string
+            The reply, empty if the command has none.
+        '''
+        handler = self.commands.get(resp.lower())
+        if handler is None:
+            return "Please provide a valid command."
+        return handler(self) or ""
 
     def has_left(self):
         '''Returns True if a pet has left the game due to hunger or boredom, otherwise False.
@@ -164,27 +170,26 @@ class Pet:
         bool
             If a pet has left
         '''
-        return self.hunger > self.leaves_hungry or self.boredom > self.leaves_bored or int(self.age) > 18
+        return self.hunger > self.leaves_hungry or self.boredom > self.leaves_bored or int(self.age) > self.leaves_age
 
-    def clock_tick(self):
+    def clock_tick(self, ticks=1):
         '''Adds a time path which changes the boredom level and hunger level of the pet.
 
+        The per-tick changes are the class attributes hunger_per_tick,
+        boredom_per_tick and age_per_tick.
+
         Parameters
         ----------
-        none
+        ticks : int
+            How many time steps pass at once (default 1).
 
         Returns
         -------
         none
         '''
-        self.boredom += 2
-        self.hunger += 2
-        if self.type == 'dog':
-            self.age += 2
-        elif self.type == 'cat':
-            self.age += 3
-        elif self.age == 'poodle':
-            self.age += 2.5
+        self.boredom += self.boredom_per_tick * ticks
+        self.hunger += self.hunger_per_tick * ticks
+        self.age += self.age_per_tick * ticks
 
     def speak(self):
         '''
@@ -231,10 +236,7 @@ class Pet:
         none
         '''
         direction = ['left', 'right']
-        if self.type == 'cat':
-            count = 5
-        else:
-            count = 3
+        count = self.play_chances
         while count > 0:
             guess = input("Which way your pet will look? Guess left/right: ")
             guess = guess.lower()
@@ -259,14 +261,38 @@ class Pet:
                 continue
 
 
+    def look(self, guess, rng=random):
+        '''One round of play() without input(): the pet looks a random way
+        and a correct guess decreases its boredom by 5.
+
+        Parameters
+        ----------
+        guess : string
+            'left' or 'right'
+        rng : random.Random
+            Source of the direction (default the random module).
+
+        Returns
+        -------
+        string
+            The direction the pet looked.
+        '''
+        direction = rng.choice(['left', 'right'])
+        if guess.lower() == direction:
+            self.boredom -= 5
+        return direction
+
+
 #######################################################################
 # ---------- Part 2: Inheritance - subclasses
 #######################################################################
 
 class Dog(Pet):
-    def __init__(self, name, sound):
-        super().__init__(name, sound)
-        self.type = 'dog'
+    __slots__ = ()
+    kind = 'dog'
+    age_per_tick = 2
+    commands = dict(Pet.commands)
+    commands["wait"] = lambda pet: "Dogs cannot wait, please provide avalid command."
 
     def speak(self):
         '''
@@ -283,10 +309,16 @@ class Dog(Pet):
 
 
 class Cat(Pet):
+    __slots__ = ('meow_count',)
+    kind = 'cat'
+    age_per_tick = 3
+    ascii_art_left = CAT_LEFT
+    ascii_art_right = CAT_RIGHT
+    play_chances = 5
+
     def __init__(self, name, sound, meow_count):
         super().__init__(name, sound)
         self.meow_count = meow_count
-        self.type = 'cat'
 
     def speak(self):
         '''
@@ -303,9 +335,12 @@ class Cat(Pet):
 
 
 class Poodle(Dog):
-    def __init__(self, name, sound):
-        super().__init__(name, sound)
-        self.type = 'poodle'
+    __slots__ = ()
+    kind = 'poodle'
+    age_per_tick = 2.5
+    commands = dict(Dog.commands)
+    commands["wait"] = lambda pet: "Poodles cannot wait, please provide avalid command."
+    commands["dance"] = lambda pet: pet.dance()
 
     def dance(self):
         return "Dancing in circles like poodles do!"
@@ -358,45 +393,45 @@ def get_meow_count():
         if resp.isnumeric():
             return int(resp)
 
-while True:
-    p = None
-    while p == None:
-        add_p = input("Would you like to adopt a pet? Y/N \n")
-        pets = {}
-        while add_p == 'Y':
-            resp_pet_type = input("What kind of pet would you like to adopt?\n").lower()
-            if resp_pet_type in ['dog','cat','poodle']:
-                name = get_name()
-                pets[name]=resp_pet_type
-                add_p = input("Would you like to adopt a pet? Y/N \n")
-                print("Now, you have", pets)
-            else:
-                print("We only have Cat, Dog and Poodle.")
-                continue
-
-        call = input("Please type one of your pets' name to call him out: \n")
-        if pets[call] == 'dog':
-            sound = get_sound()
-            p = Dog(name, sound)
-        elif pets[call] == 'cat':
-            sound = get_sound()
-            meow_count = get_meow_count()
-            p = Cat(name, sound, meow_count)
-        elif pets[call] == 'poodle':
-            sound = get_sound()
-            p = Poodle(name, sound)
-
-        while not p.has_left():
-            print()
-            print(p.status())
-
-            command = input("What should I do?\n")
-            p.do_command(command)
-            p.clock_tick()
-
-        print("Your pet",call,"has left.")
-
-    again = input("Would you like to play again? Y/N \n")
-    if again == "N":
-        break
-
+if __name__ == "__main__":
+    while True:
+        p = None
+        while p == None:
+            add_p = input("Would you like to adopt a pet? Y/N \n")
+            pets = {}
+            while add_p == 'Y':
+                resp_pet_type = input("What kind of pet would you like to adopt?\n").lower()
+                if resp_pet_type in ['dog','cat','poodle']:
+                    name = get_name()
+                    pets[name]=resp_pet_type
+                    add_p = input("Would you like to adopt a pet? Y/N \n")
+                    print("Now, you have", pets)
+                else:
+                    print("We only have Cat, Dog and Poodle.")
+                    continue
+
+            call = input("Please type one of your pets' name to call him out: \n")
+            if pets[call] == 'dog':
+                sound = get_sound()
+                p = Dog(name, sound)
+            elif pets[call] == 'cat':
+                sound = get_sound()
+                meow_count = get_meow_count()
+                p = Cat(name, sound, meow_count)
+            elif pets[call] == 'poodle':
+                sound = get_sound()
+                p = Poodle(name, sound)
+
+            while not p.has_left():
+                print()
+                print(p.status())
+
+                command = input("What should I do?\n")
+                p.do_command(command)
+                p.clock_tick()
+
+            print("Your pet",call,"has left.")
+
+        again = input("Would you like to play again? Y/N \n")
+        if again == "N":
+            break
@@ -0,0 +1,224 @@
+'''Struct-of-arrays storage for large Tamagotchi populations
+
+PetPopulation keeps hunger, boredom, age and a type code for every pet
+in NumPy arrays indexed by pet id. It applies clock_tick, feed, mood and
+has_left to the whole population (or a selection of it) as array
+operations. The per-type rates and limits come from the Pet classes, so
+the arrays follow the same rules as the objects. Individual pets can be
+hydrated into ordinary Pet/Dog/Cat/Poodle objects for the interactive
+API and stored back afterwards.
+'''
+import numpy as np
+
+from Tamagotchi import Cat, Dog, Pet, Poodle
+
+# type code -> class; the code is the index
+TYPES = [Pet, Dog, Cat, Poodle]
+TYPE_CODES = {cls.kind: code for code, cls in enumerate(TYPES)}
+
+MOODS = ["happy", "hungry", "bored"]
+HAPPY, HUNGRY, BORED = range(3)
+FEED_AMOUNT = 5
+
+
+def per_type(attribute, dtype):
+    '''returns an array of a class attribute, indexed by type code'''
+    return np.array([getattr(cls, attribute) for cls in TYPES], dtype=dtype)
+
+
+HUNGER_PER_TICK = per_type("hunger_per_tick", np.int64)
+BOREDOM_PER_TICK = per_type("boredom_per_tick", np.int64)
+AGE_PER_TICK = per_type("age_per_tick", np.float64)
+MAX_HUNGER = per_type("max_hunger", np.int64)
+MAX_BOREDOM = per_type("max_boredom", np.int64)
+LEAVES_HUNGRY = per_type("leaves_hungry", np.int64)
+LEAVES_BORED = per_type("leaves_bored", np.int64)
+LEAVES_AGE = per_type("leaves_age", np.int64)
+
+
+class PetPopulation:
+    '''many pets stored column by column
+
+    Attributes
+    ----------
+    size : int
+        The number of pets.
+    hunger, boredom, age : numpy.ndarray
+        Each pet's stats (views of the first size entries).
+    type_code : numpy.ndarray
+        Each pet's index into TYPES.
+    names, sounds : list
+        Each pet's name and sound.
+    meow_counts : dict
+        meow_count of each Cat, by pet id.
+    '''
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.names = []
+        self.sounds = []
+        self.meow_counts = {}
+        self._hunger = np.zeros(capacity, dtype=np.int64)
+        self._boredom = np.zeros(capacity, dtype=np.int64)
+        self._age = np.zeros(capacity, dtype=np.float64)
+        self._type_code = np.zeros(capacity, dtype=np.uint8)
+
+    @property
+    def hunger(self):
+        return self._hunger[:self.size]
+
+    @property
+    def boredom(self):
+        return self._boredom[:self.size]
+
+    @property
+    def age(self):
+        return self._age[:self.size]
+
+    @property
+    def type_code(self):
+        return self._type_code[:self.size]
+
+    def grow(self, needed):
+        '''doubles the column capacity until needed more pets fit'''
+        capacity = len(self._hunger)
+        if self.size + needed <= capacity:
+            return
+        while capacity < self.size + needed:
+            capacity *= 2
+        for column in ("_hunger", "_boredom", "_age", "_type_code"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def add(self, kind, name, sound, meow_count=1, hunger=None, boredom=None):
+        '''adds one pet and returns its pet id
+
+        Parameters
+        ----------
+        kind : string
+            'pet', 'dog', 'cat' or 'poodle'
+        name, sound : string
+            As for the Pet constructors.
+        meow_count : int
+            Used for cats only.
+        hunger, boredom : int
+            Starting stats; None draws them at random like Pet.__init__.
+        '''
+        code = TYPE_CODES[kind]
+        cls = TYPES[code]
+        self.grow(1)
+        pet_id = self.size
+        self._hunger[pet_id] = np.random.randint(cls.max_hunger) if hunger is None else hunger
+        self._boredom[pet_id] = np.random.randint(cls.max_boredom) if boredom is None else boredom
+        self._age[pet_id] = 0
+        self._type_code[pet_id] = code
+        self.names.append(name)
+        self.sounds.append(sound)
+        if cls is Cat:
+            self.meow_counts[pet_id] = meow_count
+        self.size += 1
+        return pet_id
+
+    def add_random(self, count, kinds=("dog", "cat", "poodle"), rng=None):
+        '''adds count pets of random kinds with random stats in one step
+
+        Returns
+        -------
+        numpy.ndarray
+            The new pet ids.
+        '''
+        rng = rng or np.random.default_rng()
+        codes = np.array([TYPE_CODES[k] for k in kinds], dtype=np.uint8)[rng.integers(len(kinds), size=count)]
+        self.grow(count)
+        ids = np.arange(self.size, self.size + count)
+        self._type_code[ids] = codes
+        self._hunger[ids] = rng.integers(MAX_HUNGER[codes])
+        self._boredom[ids] = rng.integers(MAX_BOREDOM[codes])
+        self._age[ids] = 0
+        for pet_id in ids.tolist():
+            self.names.append(str(pet_id))
+            self.sounds.append("...")
+            if TYPES[self._type_code[pet_id]] is Cat:
+                self.meow_counts[pet_id] = 1
+        self.size += count
+        return ids
+
+    @classmethod
+    def from_pets(cls, pets):
+        '''builds a population holding copies of existing Pet objects'''
+        population = cls(max(len(pets), 1))
+        for pet in pets:
+            pet_id = population.add(pet.kind, pet.name, pet.sound,
+                                    getattr(pet, "meow_count", 1), pet.hunger, pet.boredom)
+            population._age[pet_id] = pet.age
+        return population
+
+    def select(self, ids):
+        '''returns ids, or every pet id when ids is None'''
+        return slice(0, self.size) if ids is None else ids
+
+    def clock_tick(self, ticks=1, ids=None, skip_left=True):
+        '''Pet.clock_tick for many pets at once
+
+        Parameters
+        ----------
+        ticks : int
+            Time steps to apply.
+        ids : array-like of int
+            The pets to advance; None means all.
+        skip_left : bool
+            Leave pets that have already left unchanged.
+        '''
+        where = self.select(ids)
+        codes = self._type_code[where]
+        step = ticks
+        if skip_left:
+            step = np.where(self.has_left(ids), 0, ticks)
+        self._hunger[where] += HUNGER_PER_TICK[codes] * step
+        self._boredom[where] += BOREDOM_PER_TICK[codes] * step
+        self._age[where] += AGE_PER_TICK[codes] * step
+
+    def feed(self, ids=None):
+        '''Pet.feed for many pets: hunger drops by 5, never below 0'''
+        where = self.select(ids)
+        self._hunger[where] = np.maximum(self._hunger[where] - FEED_AMOUNT, 0)
+
+    def mood(self, ids=None):
+        '''Pet.mood for many pets, as codes into MOODS'''
+        where = self.select(ids)
+        codes = self._type_code[where]
+        hungry = self._hunger[where] > MAX_HUNGER[codes]
+        bored = self._boredom[where] > MAX_BOREDOM[codes]
+        return np.where(hungry, HUNGRY, np.where(bored, BORED, HAPPY)).astype(np.uint8)
+
+    def has_left(self, ids=None):
+        '''Pet.has_left for many pets, as a bool array'''
+        where = self.select(ids)
+        codes = self._type_code[where]
+        return ((self._hunger[where] > LEAVES_HUNGRY[codes])
+                | (self._boredom[where] > LEAVES_BORED[codes])
+                | (np.trunc(self._age[where]) > LEAVES_AGE[codes]))
+
+    def hydrate(self, pet_id):
+        '''returns a Pet/Dog/Cat/Poodle object with this pet's state
+
+        The object is a copy; call store() to write changes back.
+        '''
+        cls = TYPES[self._type_code[pet_id]]
+        if cls is Cat:
+            pet = cls(self.names[pet_id], self.sounds[pet_id], self.meow_counts[pet_id])
+        else:
+            pet = cls(self.names[pet_id], self.sounds[pet_id])
+        pet.hunger = int(self._hunger[pet_id])
+        pet.boredom = int(self._boredom[pet_id])
+        age = float(self._age[pet_id])
+        pet.age = int(age) if age.is_integer() else age
+        return pet
+
+    def store(self, pet_id, pet):
+        '''writes a hydrated pet's stats back into the arrays'''
+        self._hunger[pet_id] = pet.hunger
+        self._boredom[pet_id] = pet.boredom
+        self._age[pet_id] = pet.age
@@ -0,0 +1,389 @@
+'''Multi-player Tamagotchi server over a local socket
+
+Each connection is one player with their own pets. Players send one
+text command per line and get one JSON object per line back. Time does
+not advance per command as in Tamagotchi.py: a single timer task moves
+a shared PetSimulation clock forward every tick_seconds, and mood
+changes and departures are pushed to the pet's owner as they happen.
+
+Commands (pet names are per player):
+
+    adopt <dog|cat|poodle> <name> [sound] [meow_count]
+    pets
+    status <name>
+    play <name> <left|right>
+    <speak|feed|wait|dance|...> <name>
+    quit
+
+Replies are {"ok": true, "output": ...} or {"ok": false, "error": ...};
+pushed events are {"event": "mood" or "left", "pet", "mood", "tick"}.
+A player whose unread output grows past max_buffer bytes is
+disconnected rather than letting pushed events pile up on the server.
+
+    python Tamagotchi_server.py serve --port 8765
+    python Tamagotchi_server.py bench --sessions 2000
+'''
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+
+from Tamagotchi import Cat, Dog, Poodle
+from Tamagotchi_sim import LEFT, PetSimulation
+
+KINDS = {"dog": Dog, "cat": Cat, "poodle": Poodle}
+MAX_BUFFER = 256 * 1024
+
+
+async def read_line(reader):
+    '''returns the next line from reader, or b"" at the end of the stream
+
+    Raises
+    ------
+    ValueError
+        For a line longer than the reader's limit, after reading past it
+        so the next call starts on the following line.
+    '''
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            raise ValueError("line too long")
+        except asyncio.IncompleteReadError:
+            return b""
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+class Session:
+    '''one connected player
+
+    Attributes
+    ----------
+    writer : asyncio.StreamWriter
+        The player's connection.
+    pets : dict
+        Pet name -> pet id in the server's simulation, for pets that
+        have not left.
+    max_buffer : int
+        Unsent bytes allowed before push() disconnects the player.
+    '''
+
+    def __init__(self, writer, max_buffer=MAX_BUFFER):
+        self.writer = writer
+        self.pets = {}
+        self.max_buffer = max_buffer
+
+    def send(self, message):
+        '''queues one JSON line; dropped if the connection is closing'''
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b"\n")
+
+    def push(self, event):
+        '''sends an event from the timer, which cannot wait for a slow
+        reader: a player already max_buffer bytes behind is disconnected
+        '''
+        if self.writer.transport.get_write_buffer_size() > self.max_buffer:
+            self.writer.close()
+        else:
+            self.send(event)
+
+
+class TamagotchiServer:
+    '''hosts many players' pets on one shared clock
+
+    Attributes
+    ----------
+    tick_seconds : float
+        Wall-clock seconds per tick of the shared clock.
+    sim : PetSimulation
+        Every pet of every player.
+    owners : list
+        The owning Session of each pet id, or None once the owner has
+        disconnected.
+    sessions : set
+        Connected sessions.
+    requests : int
+        Commands handled so far.
+    rng : random.Random
+        Used for play guesses.
+    max_buffer : int
+        Passed to each Session.
+    '''
+
+    def __init__(self, tick_seconds=1.0, seed=None, max_buffer=MAX_BUFFER):
+        self.tick_seconds = tick_seconds
+        self.max_buffer = max_buffer
+        self.sim = PetSimulation(on_event=self.notify)
+        self.owners = []
+        self.sessions = set()
+        self.requests = 0
+        self.rng = random.Random(seed)
+        self.server = None
+        self.timer_task = None
+
+    async def start(self, host="127.0.0.1", port=0, backlog=4096):
+        '''starts listening and the timer task
+
+        backlog is raised above asyncio's default of 100 so thousands of
+        players can connect at once without SYN retries.
+
+        Returns
+        -------
+        int
+            The port listened on (useful with port=0).
+        '''
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=backlog)
+        self.timer_task = asyncio.create_task(self.timer())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        '''stops the timer and closes every connection'''
+        self.timer_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.timer_task
+        self.server.close()
+        for session in list(self.sessions):
+            session.writer.close()
+        await self.server.wait_closed()
+
+    async def timer(self):
+        '''advances the shared clock once per tick_seconds, catching up
+        with several ticks at once if the loop fell behind
+        '''
+        loop = asyncio.get_running_loop()
+        due = loop.time() + self.tick_seconds
+        while True:
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            ticks = int((loop.time() - due) // self.tick_seconds) + 1
+            self.sim.run(ticks)
+            due += ticks * self.tick_seconds
+
+    def notify(self, tick, pet_id, kind, mood):
+        '''PetSimulation.on_event: tells the pet's owner'''
+        session = self.owners[pet_id]
+        if session is None:
+            return
+        name = self.sim.pets[pet_id].name
+        if kind == LEFT:
+            del session.pets[name]
+        session.push({"event": kind, "pet": name, "mood": mood, "tick": tick})
+
+    async def handle(self, reader, writer):
+        '''serves one player until they quit or disconnect'''
+        session = Session(writer, self.max_buffer)
+        self.sessions.add(session)
+        try:
+            while True:
+                try:
+                    line = await read_line(reader)
+                    if not line:
+                        break
+                    words = line.decode().split()
+                    if words == ["quit"]:
+                        break
+                    reply = {"ok": True, "output": self.dispatch(session, words)}
+                except ValueError as e: # includes UnicodeDecodeError
+                    reply = {"ok": False, "error": str(e)}
+                self.requests += 1
+                session.send(reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            for pet_id in session.pets.values():
+                self.owners[pet_id] = None
+                self.sim.remove(pet_id)
+            writer.close()
+
+    def dispatch(self, session, words):
+        '''runs one command for a session
+
+        Parameters
+        ----------
+        session : Session
+            The player sending the command.
+        words : list
+            The command line split on whitespace.
+
+        Returns
+        -------
+        string
+            The reply text.
+
+        Raises
+        ------
+        ValueError
+            For an unknown command, pet or pet kind.
+        '''
+        if not words:
+            raise ValueError("empty command")
+        command, args = words[0].lower(), words[1:]
+        if command == "adopt":
+            if len(args) > 4:
+                raise ValueError("usage: adopt <dog|cat|poodle> <name> [sound] [meow_count]")
+            return self.adopt(session, *args)
+        if command == "pets":
+            return ", ".join("{} ({})".format(name, self.sim.pet(pet_id).mood())
+                             for name, pet_id in session.pets.items())
+        if not args:
+            raise ValueError("usage: {} <name>".format(command))
+        if args[0] not in session.pets:
+            raise ValueError("you have no pet called {}".format(args[0]))
+        pet_id = session.pets[args[0]]
+        if command == "status":
+            return self.sim.pet(pet_id).status()
+        if command == "play":
+            if len(args) < 2 or args[1].lower() not in ("left", "right"):
+                raise ValueError("usage: play <name> <left|right>")
+            direction = self.sim.interact(pet_id, lambda pet: pet.look(args[1], self.rng))
+            if direction == args[1].lower():
+                return "Correct!"
+            return "I look to the {}.".format(direction)
+        return self.sim.interact(pet_id, lambda pet: pet.command_reply(command))
+
+    def adopt(self, session, kind=None, name=None, sound="...", meow_count="1"):
+        '''adds a new pet for a session and returns the reply text'''
+        if kind is None or name is None:
+            raise ValueError("usage: adopt <dog|cat|poodle> <name> [sound] [meow_count]")
+        if kind.lower() not in KINDS:
+            raise ValueError("We only have Cat, Dog and Poodle.")
+        if name in session.pets:
+            raise ValueError("you already have a pet called {}".format(name))
+        cls = KINDS[kind.lower()]
+        if cls is Cat:
+            if not meow_count.isnumeric():
+                raise ValueError("meow_count must be a number")
+            pet = cls(name, sound, int(meow_count))
+        else:
+            pet = cls(name, sound)
+        pet_id = self.sim.add_pet(pet)
+        self.owners.append(session)
+        if self.sim.left[pet_id]:
+            return "{} left right away.".format(name)
+        session.pets[name] = pet_id
+        return pet.status()
+
+
+# CLIENT HARNESS
+
+class Client:
+    '''a scripted player for tests and load runs
+
+    Attributes
+    ----------
+    events : list
+        Pushed events received so far.
+    '''
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.events = []
+
+    async def connect(self, host="127.0.0.1", port=8765):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def request(self, line):
+        '''sends one command and returns its reply dict, collecting any
+        events that arrive before it
+        '''
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+        while True:
+            reply = await self.reader.readline()
+            if not reply:
+                raise ConnectionError("server closed the connection")
+            message = json.loads(reply)
+            if "event" in message:
+                self.events.append(message)
+            else:
+                return message
+
+    async def close(self):
+        self.writer.write(b"quit\n")
+        self.writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self.writer.wait_closed()
+
+
+SCRIPT = ["feed {}", "speak {}", "status {}", "play {} left", "wait {}", "dance {}"]
+
+
+async def run_client(host, port, requests, kind="dog"):
+    '''connects, adopts one pet and sends requests scripted commands
+
+    Returns
+    -------
+    Client
+        The closed client, with its events.
+    '''
+    client = Client()
+    await client.connect(host, port)
+    await client.request("adopt {} rex woof 2".format(kind))
+    for i in range(requests):
+        reply = await client.request(SCRIPT[i % len(SCRIPT)].format("rex"))
+        if not reply["ok"]:
+            break # the pet left
+    await client.close()
+    return client
+
+
+async def bench(sessions=1000, requests=20, tick_seconds=0.01):
+    '''runs a server and sessions concurrent scripted clients in this process
+
+    Returns
+    -------
+    dict
+        sessions, requests, events, ticks, seconds and requests_per_second
+    '''
+    server = TamagotchiServer(tick_seconds, seed=0)
+    port = await server.start()
+    kinds = list(KINDS)
+    start = time.perf_counter()
+    clients = await asyncio.gather(*[run_client("127.0.0.1", port, requests, kinds[i % len(kinds)])
+                                     for i in range(sessions)])
+    seconds = time.perf_counter() - start
+    await server.close()
+    return {
+        "sessions": sessions,
+        "requests": server.requests,
+        "events": sum(len(client.events) for client in clients),
+        "ticks": server.sim.clock,
+        "seconds": seconds,
+        "requests_per_second": server.requests / seconds,
+    }
+
+
+async def serve(host, port, tick_seconds):
+    server = TamagotchiServer(tick_seconds)
+    port = await server.start(host, port)
+    print("Serving Tamagotchi on {}:{}".format(host, port))
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-player Tamagotchi server")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    serve_parser = sub.add_parser("serve", help="run the server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--tick", type=float, default=1.0, help="seconds per tick")
+    bench_parser = sub.add_parser("bench", help="run a server and scripted clients")
+    bench_parser.add_argument("--sessions", type=int, default=1000)
+    bench_parser.add_argument("--requests", type=int, default=20)
+    bench_parser.add_argument("--tick", type=float, default=0.01)
+    args = parser.parse_args()
+    if args.mode == "serve":
+        asyncio.run(serve(args.host, args.port, args.tick))
+    else:
+        print(asyncio.run(bench(args.sessions, args.requests, args.tick)))
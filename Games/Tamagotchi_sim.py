@@ -0,0 +1,278 @@
+'''Headless, event-driven simulation of many Tamagotchi pets
+
+All pets share one clock. Between player actions a pet's stats change
+by a fixed amount per tick (Pet.clock_tick), so the tick at which its
+mood next changes, or at which it leaves, can be worked out in advance.
+PetSimulation files each pet under the tick it is next due and keeps
+the distinct due ticks in a priority queue, so every pet due at the
+same tick is handled in one batch; everything else is brought up to
+date lazily with one clock_tick(ticks) call. No function here reads
+input or prints.
+'''
+import heapq
+import math
+import time
+
+MOOD_CHANGED = "mood"
+LEFT = "left"
+
+
+class PetSimulation:
+    '''advances many pets on a shared clock
+
+    Attributes
+    ----------
+    clock : int
+        Ticks elapsed since the simulation started.
+    pets : list
+        Every pet added, indexed by pet id. Pets that left stay here.
+    synced_at : list
+        The clock value each pet's stats were last brought up to date.
+    moods : list
+        Each pet's mood as of its last event.
+    left : list
+        True for pets that have left.
+    due : list
+        The tick each pet is next due, or None. A pet filed under any
+        other tick was rescheduled since, and that entry is skipped.
+    buckets : dict
+        Tick -> ids of the pets filed under it.
+    queue : list
+        Heap of the ticks in buckets.
+    active : int
+        Pets that have not left.
+    on_event : function or None
+        Called as on_event(tick, pet_id, kind, mood) for every mood
+        change (kind MOOD_CHANGED) and departure (kind LEFT).
+    events : int
+        Events processed so far.
+    elapsed, ticks_run, pet_ticks :
+        Wall-clock seconds spent in run(), ticks advanced, and ticks
+        times pets present, for report().
+    '''
+
+    def __init__(self, on_event=None):
+        self.clock = 0
+        self.pets = []
+        self.synced_at = []
+        self.moods = []
+        self.due = []
+        self.left = []
+        self.buckets = {}
+        self.queue = []
+        self.active = 0
+        self.on_event = on_event
+        self.events = 0
+        self.elapsed = 0.0
+        self.ticks_run = 0
+        self.pet_ticks = 0
+
+    def add_pet(self, pet):
+        '''adds a pet at the current tick and returns its pet id'''
+        pet_id = len(self.pets)
+        self.pets.append(pet)
+        self.synced_at.append(self.clock)
+        self.moods.append(pet.mood())
+        self.due.append(None)
+        self.left.append(pet.has_left())
+        if not self.left[pet_id]:
+            self.active += 1
+            # scheduled with the next batch run at this tick
+            self.file(pet_id, self.clock)
+        return pet_id
+
+    def file(self, pet_id, tick):
+        '''makes tick the pet's due tick'''
+        self.due[pet_id] = tick
+        bucket = self.buckets.get(tick)
+        if bucket is None:
+            self.buckets[tick] = [pet_id]
+            heapq.heappush(self.queue, tick)
+        else:
+            bucket.append(pet_id)
+
+    def sync(self, pet_id):
+        '''applies the ticks that passed since the pet was last updated'''
+        behind = self.clock - self.synced_at[pet_id]
+        if behind and not self.left[pet_id]:
+            self.pets[pet_id].clock_tick(behind)
+        self.synced_at[pet_id] = self.clock
+
+    def pet(self, pet_id):
+        '''returns the pet with its stats up to date'''
+        self.sync(pet_id)
+        return self.pets[pet_id]
+
+    def interact(self, pet_id, action):
+        '''runs action(pet) on an up-to-date pet, e.g. Pet.feed, and
+        files it under the current tick so the next batch reschedules it
+
+        Returns
+        -------
+        Whatever action returns.
+        '''
+        if self.left[pet_id]:
+            raise ValueError("pet {} has left".format(pet_id))
+        result = action(self.pet(pet_id))
+        self.check(pet_id)
+        if not self.left[pet_id]:
+            self.file(pet_id, self.clock) # rescheduled by the next batch
+        return result
+
+    def check(self, pet_id):
+        '''records a departure or mood change of an up-to-date pet'''
+        pet = self.pets[pet_id]
+        if pet.has_left():
+            self.left[pet_id] = True
+            self.active -= 1
+            self.due[pet_id] = None
+            self.emit(pet_id, LEFT, pet.mood())
+            return
+        mood = pet.mood()
+        if mood != self.moods[pet_id]:
+            self.moods[pet_id] = mood
+            self.emit(pet_id, MOOD_CHANGED, mood)
+
+    def remove(self, pet_id):
+        '''takes a pet out of the simulation without an event, e.g. when
+        its owner goes away; it then counts as left
+        '''
+        if not self.left[pet_id]:
+            self.sync(pet_id)
+            self.left[pet_id] = True
+            self.active -= 1
+            self.due[pet_id] = None
+
+    def emit(self, pet_id, kind, mood):
+        self.events += 1
+        if self.on_event is not None:
+            self.on_event(self.clock, pet_id, kind, mood)
+
+    def run(self, ticks):
+        '''advances the shared clock by ticks, handling due pets in order
+
+        Parameters
+        ----------
+        ticks : int
+            How many ticks to advance.
+
+        Returns
+        -------
+        int
+            The number of pets still present.
+        '''
+        start = time.perf_counter()
+        end = self.clock + ticks
+        queue = self.queue
+        while queue and queue[0] <= end:
+            tick = heapq.heappop(queue)
+            self.pet_ticks += self.active * (tick - self.clock)
+            self.clock = tick
+            self.run_due(tick, self.buckets.pop(tick))
+        self.pet_ticks += self.active * (end - self.clock)
+        self.clock = end
+        self.ticks_run += ticks
+        self.elapsed += time.perf_counter() - start
+        return self.active
+
+    def run_due(self, tick, pet_ids):
+        '''handles every pet filed under tick in one pass: brings it up
+        to date, records a departure or mood change as check does, and
+        files it under the tick its mood or has_left can next change
+
+        Pet.clock_tick, mood and has_left are applied inline with each
+        class's rates and limits read once per batch, so a pet costs no
+        method calls. Only the nearest limit not yet passed matters for
+        each stat, since max_hunger <= leaves_hungry and max_boredom <=
+        leaves_bored.
+        '''
+        pets, synced_at, left, moods, due = self.pets, self.synced_at, self.left, self.moods, self.due
+        buckets, queue, on_event = self.buckets, self.queue, self.on_event
+        floor, ceil = math.floor, math.ceil
+        rules = {}
+        for pet_id in pet_ids:
+            if due[pet_id] != tick:
+                continue # rescheduled or left since it was filed here
+            pet = pets[pet_id]
+            cls = type(pet)
+            rule = rules.get(cls)
+            if rule is None:
+                rule = rules[cls] = (cls.hunger_per_tick, cls.boredom_per_tick, cls.age_per_tick,
+                                     cls.max_hunger, cls.max_boredom, cls.leaves_hungry,
+                                     cls.leaves_bored, cls.leaves_age)
+            (hunger_rate, boredom_rate, age_rate, max_hunger, max_boredom,
+             leaves_hungry, leaves_bored, leaves_age) = rule
+            # clock_tick
+            behind = tick - synced_at[pet_id]
+            synced_at[pet_id] = tick
+            pet.hunger = hunger = pet.hunger + hunger_rate * behind
+            pet.boredom = boredom = pet.boredom + boredom_rate * behind
+            pet.age = age = pet.age + age_rate * behind
+            # mood and has_left
+            if hunger <= max_hunger and boredom <= max_boredom:
+                mood = "happy"
+            elif hunger > max_hunger:
+                mood = "hungry"
+            else:
+                mood = "bored"
+            if hunger > leaves_hungry or boredom > leaves_bored or int(age) > leaves_age:
+                left[pet_id] = True
+                due[pet_id] = None
+                self.active -= 1
+                self.events += 1
+                if on_event is not None:
+                    on_event(tick, pet_id, LEFT, mood)
+                continue
+            if mood != moods[pet_id]:
+                moods[pet_id] = mood
+                self.events += 1
+                if on_event is not None:
+                    on_event(tick, pet_id, MOOD_CHANGED, mood)
+            # ticks until the next change, at least 1
+            wait = None
+            if hunger_rate > 0:
+                limit = max_hunger if hunger <= max_hunger else leaves_hungry
+                wait = floor((limit - hunger) / hunger_rate) + 1
+            if boredom_rate > 0:
+                limit = max_boredom if boredom <= max_boredom else leaves_bored
+                ticks = floor((limit - boredom) / boredom_rate) + 1
+                if wait is None or ticks < wait:
+                    wait = ticks
+            if age_rate > 0: # has_left compares int(age)
+                ticks = ceil((leaves_age + 1 - age) / age_rate)
+                if wait is None or ticks < wait:
+                    wait = ticks
+            if wait is None:
+                due[pet_id] = None
+                continue
+            due[pet_id] = tick + wait
+            bucket = buckets.get(tick + wait)
+            if bucket is None:
+                buckets[tick + wait] = [pet_id]
+                heapq.heappush(queue, tick + wait)
+            else:
+                bucket.append(pet_id)
+
+    def sync_all(self):
+        '''brings every pet's stats up to the current tick'''
+        for pet_id in range(len(self.pets)):
+            self.sync(pet_id)
+
+    def report(self):
+        '''returns throughput figures for the run() calls so far
+
+        Returns
+        -------
+        dict
+            ticks, pet_ticks (ticks times pets present), events, seconds,
+            ticks_per_second and pet_ticks_per_second
+        '''
+        seconds = self.elapsed or float("nan")
+        return {
+            "ticks": self.ticks_run,
+            "pet_ticks": self.pet_ticks,
+            "events": self.events,
+            "seconds": self.elapsed,
+            "ticks_per_second": self.ticks_run / seconds,
+            "pet_ticks_per_second": self.pet_ticks / seconds,
+        }
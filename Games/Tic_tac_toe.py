@@ -1,3 +1,5 @@
+import random
+
 # CONSTANTS
 PLAYER_NAMES = ["Nobody", "X", "O"]
 
@@ -22,7 +24,73 @@ def player_name(player_id):
     return PLAYER_NAMES[player_id]
 
 
-def display_board(board):
+# RENDERING
+# CELL_TOKENS[(cells, width)][i][player_id] is the text shown for cell i,
+# including the divider or newline that follows it
+CELL_TOKENS = {}
+# finished renders of 3x3 boards, keyed by tuple(board)
+RENDER_CACHE = {}
+
+
+def cell_tokens(cells, width):
+    '''returns the precomputed cell texts for a board shape
+
+    Parameters
+    ----------
+    cells: int
+        the number of cells on the board
+    width: int
+        cells per row
+
+    Returns
+    -------
+    list
+        one list per cell, indexed by the player ID in that cell
+    '''
+    key = (cells, width)
+    tokens = CELL_TOKENS.get(key)
+    if tokens is None:
+        tokens = []
+        for i in range(cells):
+            # every row of cells, start a new row; within a row, divide the cells
+            end = "\n" if (i + 1) % width == 0 else " | "
+            # displayed numbers are one greater than the board index
+            tokens.append([str(i + 1) + end] +
+                          [player_name(p) + end for p in range(1, len(PLAYER_NAMES))])
+        CELL_TOKENS[key] = tokens
+    return tokens
+
+
+def render_board(board, width=3):
+    '''returns the text display_board shows for a board
+
+    Built with one join over precomputed cell texts; 3x3 boards are
+    also cached, since there are at most 3**9 of them.
+
+    Parameters
+    ----------
+    board: list
+        the playing board
+    width: int (optional)
+        cells per row
+
+    Returns
+    -------
+    string
+        the rows of the board, each ending in a newline
+    '''
+    if len(board) == 9 and width == 3:
+        key = tuple(board)
+        text = RENDER_CACHE.get(key)
+        if text is None:
+            tokens = cell_tokens(9, 3)
+            text = RENDER_CACHE[key] = "".join([tokens[i][board[i]] for i in range(9)])
+        return text
+    tokens = cell_tokens(len(board), width)
+    return "".join([tokens[i][board[i]] for i in range(len(board))])
+
+
+def display_board(board, width=3, stream=None):
     '''display the current state of the board
 
     board layout:
@@ -31,31 +99,28 @@ def display_board(board):
     7 | 8 | 9
 
     Numbers are replaced by players' names once they move.
-    Iterate through the board and choose the right thing
-    to display for each cell.
+    The text comes from render_board.
 
     Parameters
     ----------
     board: list
         the playing board
+    width: int (optional)
+        cells per row, for square boards larger than 3x3
+    stream: file object (optional)
+        write to this text stream (e.g. a buffered log file) instead
+        of printing
 
     Returns
     -------
     None
     '''
-    board_to_show = "" # string that will display the board, starts empty
-    for i in range(len(board)):
-        if board[i] == 0: # 0 means unoccupied
-            # displayed numbers are one greater than the board index
-            board_to_show += str(i + 1) # display cell number
-        else:
-            board_to_show += player_name(board[i]) # display player's mark
-        if (i + 1) % 3 == 0: # every 3 cells, start a new row
-            board_to_show += "\n"
-        else:
-            board_to_show += " | " # within a row, divide the cells
-    print()
-    print(board_to_show)
+    board_to_show = render_board(board, width)
+    if stream is None:
+        print()
+        print(board_to_show)
+    else:
+        stream.write("\n" + board_to_show + "\n")
 
 
 def make_move(player, board):
@@ -210,6 +275,92 @@ def check_win(board):
     return check_win_diagonal(board)
 
 
+# BITBOARDS
+# A board can also be held as two 9-bit ints, one per player, with bit i
+# set when that player has marked cell i (cells numbered as board indices).
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000,   # rows
+             0b001001001, 0b010010010, 0b100100100,   # columns
+             0b100010001, 0b001010100]                # diagonals
+
+# WIN_TABLE[bits] is 1 if the marks in bits contain a full line
+WIN_TABLE = bytes(int(any(bits & mask == mask for mask in WIN_MASKS))
+                  for bits in range(512))
+
+
+def board_to_bits(board):
+    '''converts a board list into bitboards
+
+    Parameters
+    ----------
+    board: list
+        the playing board
+
+    Returns
+    -------
+    tuple
+        (x_bits, o_bits), the cells marked by player 1 and player 2
+    '''
+    x_bits = 0
+    o_bits = 0
+    for i in range(len(board)):
+        if board[i] == 1:
+            x_bits |= 1 << i
+        elif board[i] == 2:
+            o_bits |= 1 << i
+    return x_bits, o_bits
+
+
+def bits_to_board(x_bits, o_bits):
+    '''converts bitboards back into a board list'''
+    return [1 if x_bits >> i & 1 else 2 if o_bits >> i & 1 else 0
+            for i in range(9)]
+
+
+def has_line(bits):
+    '''checks one player's bitboard against the eight winning lines
+
+    Parameters
+    ----------
+    bits: int
+        one player's bitboard
+
+    Returns
+    -------
+    bool
+        True if the marks contain a full row, column or diagonal
+    '''
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def check_win_bits(x_bits, o_bits):
+    '''checks bitboards to see if there's a winner
+
+    Equivalent to check_win for any board reachable in play (at most
+    one player can have a line). Uses the precomputed WIN_TABLE, so it
+    is two lookups rather than up to 24 comparisons.
+
+    Parameters
+    ----------
+    x_bits: int
+        player 1's bitboard
+    o_bits: int
+        player 2's bitboard
+
+    Returns
+    -------
+    int
+        the player ID of the winner. 0 means no winner found.
+    '''
+    if WIN_TABLE[x_bits]:
+        return 1
+    if WIN_TABLE[o_bits]:
+        return 2
+    return 0
+
+
 def next_player(current_player):
     '''determines who goes next
 
@@ -233,23 +384,97 @@ def next_player(current_player):
         return 1
 
 
-# MAIN PROGRAM (INDENT LEVEL 0)
+# STRATEGIES
+# A strategy is a function strategy(board, player) that returns the
+# board index (0-8) of an empty cell for player to mark.
+
+def random_strategy(rng=random):
+    '''makes a strategy that picks a random empty cell
+
+    Parameters
+    ----------
+    rng: random.Random (optional)
+        the random source; defaults to the random module
+
+    Returns
+    -------
+    function
+        the strategy
+    '''
+    def strategy(board, player):
+        return rng.choice([i for i in range(len(board)) if board[i] == 0])
+    return strategy
+
+
+def scripted_strategy(moves):
+    '''makes a strategy that plays the first empty cell from a fixed list
+
+    Parameters
+    ----------
+    moves: list
+        board indices in order of preference
+
+    Returns
+    -------
+    function
+        the strategy
+    '''
+    moves = list(moves)
+    def strategy(board, player):
+        for move in moves:
+            if board[move] == 0:
+                return move
+        raise ValueError("no scripted move is free")
+    return strategy
 
-# GLOBAL VARIABLES
-board = [0, 0, 0,   # top row:    indices 0, 1, 2
-         0, 0, 0,   # middle row: indices 3, 4, 5
-         0, 0, 0]   # bottom row: indices 6, 7, 8
 
-player = 1          # X goes first
-moves_left = 9      # number of moves so far
-winner = 0          # "Nobody" is winning to start
+def play_game(strategies=(None, None), show=True):
+    '''plays one game from an empty board
+
+    Parameters
+    ----------
+    strategies: tuple (optional)
+        the strategy for X and for O. None means a human player who is
+        asked for moves with make_move.
+    show: bool (optional)
+        display the board and messages; turn off for headless play
 
-while(moves_left > 0 and winner == 0):
-    display_board(board)
-    print("It's player {}'s turn.".format(player))
-    make_move(player, board)
-    winner = check_win(board)
-    player = next_player(player)
-    moves_left -= 1
-    print("Game over!",'Nobody' if winner == 0 else winner, "wins the game!")
-  
\ No newline at end of file
+    Returns
+    -------
+    int
+        the player ID of the winner. 0 means a draw.
+    '''
+    board = [0, 0, 0,   # top row:    indices 0, 1, 2
+             0, 0, 0,   # middle row: indices 3, 4, 5
+             0, 0, 0]   # bottom row: indices 6, 7, 8
+
+    player = 1          # X goes first
+    moves_left = 9      # number of moves so far
+    winner = 0          # "Nobody" is winning to start
+
+    while(moves_left > 0 and winner == 0):
+        if show:
+            display_board(board)
+            print("It's player {}'s turn.".format(player))
+        strategy = strategies[player - 1]
+        if strategy is None:
+            make_move(player, board)
+        else:
+            board[strategy(board, player)] = player
+        winner = check_win(board)
+        player = next_player(player)
+        moves_left -= 1
+    if show:
+        display_board(board)
+        print("Game over!", player_name(winner), "wins the game!")
+    return winner
+
+
+# MAIN PROGRAM (runs only when this file is executed, not imported)
+
+if __name__ == "__main__":
+    if input("Play against the computer? Y/N ").strip().upper() == "Y":
+        from Tic_tac_toe_ai import minimax_strategy
+        play_game((None, minimax_strategy))
+    else:
+        play_game()
@@ -0,0 +1,372 @@
+'''Computer opponent for Tic_tac_toe.py
+
+The whole game is solved once with memoized minimax. The result is one
+byte per position in a table indexed by the base-3 board encoding, so
+looking up the best move is a single index into the table.
+
+Each table byte packs (value + 1) << 4 | move, where value is the
+outcome for the player to move under perfect play (1 win, 0 draw,
+-1 loss) and move is a board index 0-8 (GAME_OVER when the game has
+ended). Positions that cannot be reached from the empty board are
+UNREACHABLE.
+'''
+import os
+from collections import OrderedDict
+
+from Tic_tac_toe import check_win, next_player
+
+BOARD_CELLS = 9
+POSITIONS = 3 ** BOARD_CELLS
+GAME_OVER = 0x0F
+UNREACHABLE = 0xFF
+POWERS = [3 ** i for i in range(BOARD_CELLS)]
+
+TABLE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tic_tac_toe_table.bin")
+
+
+def encode_board(board):
+    '''returns the base-3 encoding of a board
+
+    Cell i contributes board[i] * 3**i, so every board maps to a
+    distinct int in range(3**9).
+
+    Parameters
+    ----------
+    board: list
+        the playing board
+
+    Returns
+    -------
+    int
+        the board's encoding
+    '''
+    code = 0
+    for i in range(BOARD_CELLS - 1, -1, -1):
+        code = code * 3 + board[i]
+    return code
+
+
+def decode_board(code):
+    '''returns the board list for a base-3 encoding'''
+    board = []
+    for _ in range(BOARD_CELLS):
+        code, cell = divmod(code, 3)
+        board.append(cell)
+    return board
+
+
+def player_to_move(board):
+    '''returns whose turn it is; X (1) always moves first'''
+    return 1 if board.count(1) == board.count(2) else 2
+
+
+def solve():
+    '''solves every reachable position with memoized minimax
+
+    Each of the 5,478 reachable positions is searched exactly once;
+    the memo (the table itself) answers every later visit. Alpha-beta
+    cutoffs are not used here because they would leave some entries
+    holding bounds instead of exact values.
+
+    Returns
+    -------
+    bytearray
+        the packed table described in the module docstring
+    '''
+    table = bytearray([UNREACHABLE]) * POSITIONS
+
+    def value(board, code, player):
+        if table[code] != UNREACHABLE:
+            return (table[code] >> 4) - 1
+        if check_win(board) != 0:
+            # the previous move won, so the player to move has lost
+            table[code] = 0 << 4 | GAME_OVER
+            return -1
+        if 0 not in board:
+            table[code] = 1 << 4 | GAME_OVER
+            return 0
+        best, best_move = -2, GAME_OVER
+        opponent = next_player(player)
+        for move in range(BOARD_CELLS):
+            if board[move] == 0:
+                board[move] = player
+                score = -value(board, code + player * POWERS[move], opponent)
+                board[move] = 0
+                if score > best:
+                    best, best_move = score, move
+        table[code] = (best + 1) << 4 | best_move
+        return best
+
+    value([0] * BOARD_CELLS, 0, 1)
+    return table
+
+
+def save_table(table, filename=TABLE_FILENAME):
+    '''writes the solved table to disk as raw bytes'''
+    with open(filename, "wb") as fw:
+        fw.write(table)
+
+
+def load_table(filename=TABLE_FILENAME):
+    '''reads the solved table from disk, solving and saving it first if
+    the file is missing or the wrong size
+
+    Returns
+    -------
+    bytearray
+        the packed table
+    '''
+    try:
+        with open(filename, "rb") as f:
+            table = bytearray(f.read())
+        if len(table) == POSITIONS:
+            return table
+    except OSError:
+        pass
+    table = solve()
+    try:
+        save_table(table, filename)
+    except OSError:
+        pass # read-only install, solve again next time
+    return table
+
+
+TABLE = None
+
+
+def get_table():
+    '''returns the solved table, loading it on first use'''
+    global TABLE
+    if TABLE is None:
+        TABLE = load_table()
+    return TABLE
+
+
+def best_move(board):
+    '''returns the best move for the player whose turn it is
+
+    Parameters
+    ----------
+    board: list
+        the playing board
+
+    Returns
+    -------
+    int
+        a board index 0-8, or None if the game is over or the position
+        cannot occur in a real game
+    '''
+    entry = get_table()[encode_board(board)]
+    if entry == UNREACHABLE or entry & 0x0F == GAME_OVER:
+        return None
+    return entry & 0x0F
+
+
+def position_value(board):
+    '''returns the perfect-play outcome for the player to move:
+    1 win, 0 draw, -1 loss, or None for an unreachable position
+    '''
+    entry = get_table()[encode_board(board)]
+    if entry == UNREACHABLE:
+        return None
+    return (entry >> 4) - 1
+
+
+def minimax_strategy(board, player):
+    '''a Tic_tac_toe.play_game strategy that always plays best_move'''
+    return best_move(board)
+
+
+# SYMMETRY-AWARE SEARCH
+
+# the 8 rotations and reflections of the board; the symmetric board has
+# board[perm[i]] in cell i
+IDENTITY = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+ROTATE = [6, 3, 0, 7, 4, 1, 8, 5, 2]     # a quarter turn clockwise
+MIRROR = [2, 1, 0, 5, 4, 3, 8, 7, 6]     # left-right flip
+
+
+def compose(first, then):
+    '''returns the permutation that applies first and then then'''
+    return [first[then[i]] for i in range(BOARD_CELLS)]
+
+
+SYMMETRIES = []
+for base in (IDENTITY, MIRROR):
+    perm = base
+    for _ in range(4):
+        SYMMETRIES.append(perm)
+        perm = compose(perm, ROTATE)
+
+
+def canonical_form(board):
+    '''finds the smallest encoding among the board's 8 symmetric copies
+
+    Parameters
+    ----------
+    board: list
+        the playing board
+
+    Returns
+    -------
+    tuple
+        (code, perm): the canonical encoding and the symmetry that
+        produced it. A move m on the canonical board is cell perm[m]
+        on the original board.
+    '''
+    best_code, best_perm = None, None
+    for perm in SYMMETRIES:
+        code = 0
+        for i in range(BOARD_CELLS - 1, -1, -1):
+            code = code * 3 + board[perm[i]]
+        if best_code is None or code < best_code:
+            best_code, best_perm = code, perm
+    return best_code, best_perm
+
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    '''a size-bounded LRU cache of searched positions
+
+    Boards are stored under their canonical form, so all 8 symmetric
+    copies of a position share one entry. With symmetric=False the
+    plain encoding is used instead, which is handy for comparison.
+
+    Attributes
+    ----------
+    max_size: int
+        entries kept before the least recently used one is evicted
+    symmetric: bool
+        whether boards are canonicalized before lookup
+    hits, misses, evictions, stores: int
+        counters for tuning max_size
+    '''
+
+    def __init__(self, max_size=100000, symmetric=True):
+        self.max_size = max_size
+        self.symmetric = symmetric
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+    def key(self, board):
+        '''returns (lookup key, symmetry) for a board'''
+        if self.symmetric:
+            return canonical_form(board)
+        return encode_board(board), IDENTITY
+
+    def get(self, board):
+        '''looks a board up
+
+        Returns
+        -------
+        tuple or None
+            (value, flag, move) with move translated to this board's
+            cells, or None on a miss
+        '''
+        code, perm = self.key(board)
+        entry = self.entries.get(code)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(code)
+        value, flag, move = entry
+        return value, flag, None if move is None else perm[move]
+
+    def put(self, board, value, flag, move):
+        '''stores a search result; move is a cell of this board or None'''
+        code, perm = self.key(board)
+        if move is not None:
+            move = perm.index(move)
+        if code in self.entries:
+            self.entries.move_to_end(code)
+        elif len(self.entries) >= self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[code] = (value, flag, move)
+        self.stores += 1
+
+    def stats(self):
+        '''returns the counters and current size as a dict'''
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class Searcher:
+    '''alpha-beta (negamax) search built on check_win
+
+    Attributes
+    ----------
+    table: TranspositionTable or None
+        cache shared across searches; None searches without one
+    nodes: int
+        positions visited so far
+    '''
+
+    def __init__(self, table=None):
+        self.table = table
+        self.nodes = 0
+
+    def search(self, board, player=None, alpha=-2, beta=2):
+        '''returns (value, move) for the player to move
+
+        value is 1 win, 0 draw, -1 loss under perfect play; move is a
+        board index or None when the game is already over. board is
+        modified during the search and restored before returning.
+        '''
+        self.nodes += 1
+        if player is None:
+            player = player_to_move(board)
+        if check_win(board) != 0:
+            return -1, None
+        if 0 not in board:
+            return 0, None
+
+        original_alpha = alpha
+        first = None
+        if self.table is not None:
+            cached = self.table.get(board)
+            if cached is not None:
+                value, flag, move = cached
+                if flag == EXACT:
+                    return value, move
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, move
+                first = move
+
+        moves = [m for m in range(BOARD_CELLS) if board[m] == 0]
+        if first is not None:
+            moves.remove(first)
+            moves.insert(0, first) # try the cached best move first
+        best, best_move = -2, None
+        opponent = next_player(player)
+        for move in moves:
+            board[move] = player
+            score = -self.search(board, opponent, -beta, -alpha)[0]
+            board[move] = 0
+            if score > best:
+                best, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if self.table is not None:
+            if best <= original_alpha:
+                flag = UPPER
+            elif best >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.put(board, best, flag, best_move)
+        return best, best_move
@@ -0,0 +1,142 @@
+'''Headless batch self-play for Tic_tac_toe.py
+
+Plays many games between two strategies with Tic_tac_toe.play_game,
+split into chunks across a process pool, and reports win/draw counts
+and throughput.
+
+    python Tic_tac_toe_selfplay.py --games 1000000 --x random --o minimax
+'''
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Tic_tac_toe import play_game, random_strategy, scripted_strategy
+from Tic_tac_toe_ai import minimax_strategy
+
+# name: function(rng) -> strategy. Looked up by name in each worker so
+# only strings cross the process boundary.
+STRATEGIES = {
+    "random": random_strategy,
+    "minimax": lambda rng: minimax_strategy,
+    "scripted": lambda rng: scripted_strategy([4, 0, 2, 6, 8, 1, 3, 5, 7]),
+}
+
+
+def play_chunk(x_name, o_name, games, seed):
+    '''plays games headless games and counts the results
+
+    Parameters
+    ----------
+    x_name, o_name: string
+        keys of STRATEGIES for X and O
+    games: int
+        the number of games to play
+    seed: string
+        seed for this chunk's random.Random
+
+    Returns
+    -------
+    list
+        [draws, X wins, O wins]
+    '''
+    rng = random.Random(seed)
+    strategies = (STRATEGIES[x_name](rng), STRATEGIES[o_name](rng))
+    counts = [0, 0, 0]
+    for _ in range(games):
+        counts[play_game(strategies, show=False)] += 1
+    return counts
+
+
+class SimulationReport:
+    '''results of a simulate() run
+
+    Attributes
+    ----------
+    games: int
+        games played
+    draws, x_wins, o_wins: int
+        the outcome counts
+    seconds: float
+        wall-clock time
+    workers: int
+        processes used
+    '''
+
+    def __init__(self, counts, seconds, workers):
+        self.draws, self.x_wins, self.o_wins = counts
+        self.games = sum(counts)
+        self.seconds = seconds
+        self.workers = workers
+
+    def games_per_second(self):
+        return self.games / self.seconds
+
+    def games_per_second_per_core(self):
+        return self.games_per_second() / self.workers
+
+    def __str__(self):
+        return ("{} games: X {} ({:.1%}), O {} ({:.1%}), draws {} ({:.1%})\n"
+                "{:.0f} games/s total, {:.0f} games/s per core ({} workers)").format(
+            self.games, self.x_wins, self.x_wins / self.games,
+            self.o_wins, self.o_wins / self.games,
+            self.draws, self.draws / self.games,
+            self.games_per_second(), self.games_per_second_per_core(), self.workers)
+
+
+def simulate(games, x_name="random", o_name="random", workers=None, seed=None, chunk_games=10000):
+    '''plays games between two named strategies across a process pool
+
+    Parameters
+    ----------
+    games: int
+        the total number of games
+    x_name, o_name: string (optional)
+        keys of STRATEGIES for X and O
+    workers: int (optional)
+        processes to use. None uses os.cpu_count(); 1 plays in this process.
+    seed: int or string (optional)
+        makes the run reproducible for any number of workers
+    chunk_games: int (optional)
+        games per unit of work
+
+    Returns
+    -------
+    SimulationReport
+    '''
+    if games < 1:
+        raise ValueError("games must be at least 1, not {}".format(games))
+    for name in (x_name, o_name):
+        if name not in STRATEGIES:
+            raise ValueError("unknown strategy {!r}, choose from {}".format(name, sorted(STRATEGIES)))
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    workers = workers or os.cpu_count() or 1
+    sizes = [min(chunk_games, games - start) for start in range(0, games, chunk_games)]
+    args = [(x_name, o_name, size, "{}:{}".format(seed, k)) for k, size in enumerate(sizes)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [play_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(play_chunk, *zip(*args)))
+    seconds = time.perf_counter() - start
+
+    counts = [0, 0, 0]
+    for result in results:
+        for i in range(3):
+            counts[i] += result[i]
+    return SimulationReport(counts, seconds, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Tic-tac-toe self-play")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--x", default="random", choices=sorted(STRATEGIES))
+    parser.add_argument("--o", default="random", choices=sorted(STRATEGIES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", default=None)
+    args = parser.parse_args()
+    print(simulate(args.games, args.x, args.o, args.workers, args.seed))
@@ -0,0 +1,262 @@
+'''Benchmarks for the games in this folder
+
+Run with: python benchmarks.py
+'''
+import random
+import time
+
+import Gomoku
+import Tic_tac_toe
+import Tic_tac_toe_ai
+
+
+def random_boards(count, seed=0):
+    '''returns count random 3x3 boards with cells drawn from 0, 1, 2'''
+    rng = random.Random(seed)
+    return [[rng.randrange(3) for _ in range(9)] for _ in range(count)]
+
+
+def per_second(count, func):
+    '''runs func() once and returns count divided by the elapsed time'''
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+def bench_win_check(count=1000000):
+    '''prints positions checked per second with list and bitboard checks'''
+    boards = random_boards(count)
+    bitboards = [Tic_tac_toe.board_to_bits(board) for board in boards]
+    check_win = Tic_tac_toe.check_win
+    check_win_bits = Tic_tac_toe.check_win_bits
+    has_line = Tic_tac_toe.has_line
+
+    def lists():
+        for board in boards:
+            check_win(board)
+
+    def masks():
+        for x_bits, o_bits in bitboards:
+            has_line(x_bits) or has_line(o_bits)
+
+    def table():
+        for x_bits, o_bits in bitboards:
+            check_win_bits(x_bits, o_bits)
+
+    for name, func in [("check_win", lists), ("has_line", masks), ("check_win_bits", table)]:
+        print("{:<16} {:>12.0f} positions/s".format(name, per_second(count, func)))
+
+
+def bench_gomoku(sizes=((15, 5), (19, 5), (30, 5)), games=10):
+    '''prints moves per second on random games, checking each move with
+    check_win_at (lines through the move) vs check_win_full (whole board)
+    '''
+    rng = random.Random(1)
+    for size, k in sizes:
+        orders = []
+        for _ in range(games):
+            cells = list(range(size * size))
+            rng.shuffle(cells)
+            orders.append(cells)
+
+        def play(check):
+            moves = 0
+            for cells in orders:
+                board = [0] * (size * size)
+                player = 1
+                for index in cells:
+                    board[index] = player
+                    moves += 1
+                    if check(board, index):
+                        break
+                    player = Tic_tac_toe.next_player(player)
+            return moves
+
+        incremental = lambda board, index: Gomoku.check_win_at(board, size, k, index)
+        full = lambda board, index: Gomoku.check_win_full(board, size, k)
+        moves = play(incremental)
+        print("{0}x{0} k={1}: {2:>10.0f} moves/s incremental {3:>10.0f} moves/s full scan".format(
+            size, k, per_second(moves, lambda: play(incremental)),
+            per_second(moves, lambda: play(full))))
+
+
+def bench_transpositions():
+    '''prints nodes searched to solve the empty board with no cache, a
+    plain transposition table and a symmetry-canonical one
+    '''
+    cases = [("no table", None),
+             ("plain table", Tic_tac_toe_ai.TranspositionTable(symmetric=False)),
+             ("symmetric table", Tic_tac_toe_ai.TranspositionTable())]
+    for name, table in cases:
+        searcher = Tic_tac_toe_ai.Searcher(table)
+        start = time.perf_counter()
+        searcher.search([0] * 9)
+        seconds = time.perf_counter() - start
+        stats = "" if table is None else "hit rate {:.0%}, {} entries".format(
+            table.stats()["hit_rate"], table.stats()["size"])
+        print("{:<16} {:>7} nodes {:>8.1f} ms  {}".format(name, searcher.nodes, seconds * 1000, stats))
+
+
+def bench_render(count=200000):
+    '''prints boards rendered per second: per-cell concatenation (the old
+    display_board loop), render_board, and display_board to a buffer
+    '''
+    import io
+    boards = random_boards(count, seed=2)
+    player_name = Tic_tac_toe.player_name
+
+    def concat():
+        for board in boards:
+            board_to_show = ""
+            for i in range(len(board)):
+                if board[i] == 0:
+                    board_to_show += str(i + 1)
+                else:
+                    board_to_show += player_name(board[i])
+                if (i + 1) % 3 == 0:
+                    board_to_show += "\n"
+                else:
+                    board_to_show += " | "
+
+    def joined():
+        for board in boards:
+            Tic_tac_toe.render_board(board)
+
+    def streamed():
+        buffer = io.StringIO()
+        for board in boards:
+            Tic_tac_toe.display_board(board, stream=buffer)
+
+    for name, func in [("concatenate", concat), ("render_board", joined), ("display to buffer", streamed)]:
+        print("{:<18} {:>12.0f} boards/s".format(name, per_second(count, func)))
+
+
+def make_pets(count, seed=3):
+    '''returns count pets of mixed kinds with seeded random stats'''
+    import Tamagotchi
+    random.seed(seed)
+    kinds = [lambda n: Tamagotchi.Dog(n, "woof"), lambda n: Tamagotchi.Cat(n, "meow", 2),
+             lambda n: Tamagotchi.Poodle(n, "yo")]
+    return [kinds[i % 3](str(i)) for i in range(count)]
+
+
+def bench_pets(arrivals=1000, ticks=200, feed_every=3):
+    '''prints pet-ticks per second for the event-driven PetSimulation
+    against calling clock_tick, mood and has_left on every pet every
+    tick. Each tick new pets arrive and every feed_every-th new pet is fed.
+    '''
+    import Tamagotchi
+    import Tamagotchi_sim
+    batches = [make_pets(arrivals, seed=t) for t in range(ticks)]
+    naive_batches = [make_pets(arrivals, seed=t) for t in range(ticks)]
+
+    sim = Tamagotchi_sim.PetSimulation()
+    start = time.perf_counter()
+    for t in range(ticks):
+        ids = [sim.add_pet(pet) for pet in batches[t]]
+        for pet_id in ids[::feed_every]:
+            sim.interact(pet_id, Tamagotchi.Pet.feed)
+        sim.run(1)
+    event_seconds = time.perf_counter() - start
+
+    # the same pets ticked one by one, tracking moods so that both sides
+    # find the same mood changes and departures
+    present = []
+    pet_ticks = events = 0
+    start = time.perf_counter()
+    for t in range(ticks):
+        new = naive_batches[t]
+        moods = [pet.mood() for pet in new]
+        for i in range(0, len(new), feed_every):
+            new[i].feed()
+            if new[i].mood() != moods[i]:
+                moods[i] = new[i].mood()
+                events += 1
+        present.extend([pet, mood] for pet, mood in zip(new, moods) if not pet.has_left())
+        still = []
+        for entry in present:
+            pet = entry[0]
+            pet.clock_tick()
+            if pet.has_left():
+                events += 1
+                continue
+            mood = pet.mood()
+            if mood != entry[1]:
+                entry[1] = mood
+                events += 1
+            still.append(entry)
+        pet_ticks += len(present)
+        present = still
+    naive_seconds = time.perf_counter() - start
+
+    print("event-driven {:>12.0f} pet-ticks/s, {} events".format(
+        sim.report()["pet_ticks"] / event_seconds, sim.events))
+    print("every pet    {:>12.0f} pet-ticks/s, {} events".format(pet_ticks / naive_seconds, events))
+
+
+def bench_population(count=100000, ticks=10):
+    '''prints pet-ticks per second for clock_tick/mood/has_left on Pet
+    objects vs the same steps on a PetPopulation
+    '''
+    import Tamagotchi_population
+    pets = make_pets(count)
+    population = Tamagotchi_population.PetPopulation.from_pets(pets)
+
+    def objects():
+        for _ in range(ticks):
+            for pet in pets:
+                pet.clock_tick()
+                pet.mood()
+                pet.has_left()
+
+    def arrays():
+        for _ in range(ticks):
+            population.clock_tick(skip_left=False)
+            population.mood()
+            population.has_left()
+
+    for name, func in [("Pet objects", objects), ("PetPopulation", arrays)]:
+        print("{:<14} {:>14.0f} pet-ticks/s".format(name, per_second(count * ticks, func)))
+
+
+def bench_pet_commands(count=10000, commands=200000):
+    '''prints memory per pet and do_command calls per second (output is
+    sent to a null stream so printing does not dominate)
+    '''
+    import contextlib
+    import io
+    import tracemalloc
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    pets = make_pets(count)
+    per_pet = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+
+    words = ["speak", "feed", "wait", "dance", "jump"]
+    calls = [(pets[i % count], words[i % len(words)]) for i in range(commands)]
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for pet, word in calls:
+                pet.do_command(word)
+
+    print("{:>8.0f} bytes/pet {:>12.0f} commands/s".format(per_pet, per_second(commands, run)))
+
+
+def bench_server(sessions=2000, requests=20):
+    '''prints requests per second for concurrent clients of the pet server'''
+    import asyncio
+    import Tamagotchi_server
+    result = asyncio.run(Tamagotchi_server.bench(sessions, requests, tick_seconds=1.0))
+    print("{:>6} sessions {:>12.0f} requests/s".format(sessions, result["requests_per_second"]))
+
+
+if __name__ == "__main__":
+    bench_win_check()
+    bench_gomoku()
+    bench_transpositions()
+    bench_render()
+    bench_pets()
+    bench_population()
+    bench_pet_commands()
+    bench_server()
@@ -0,0 +1,333 @@
+import io
+import json
+import random
+import unittest
+import Gomoku
+import Tamagotchi
+import Tamagotchi_server
+import Tamagotchi_sim
+import Tic_tac_toe
+import Tic_tac_toe_ai as ai
+import Tic_tac_toe_selfplay
+
+try:
+    import Tamagotchi_population
+except ImportError:
+    Tamagotchi_population = None
+
+
+class TestGomoku(unittest.TestCase):
+
+    def test_one_in_a_row(self):
+        game = Gomoku.Game(size=3, k=1)
+        self.assertEqual(game.play(4), 1)
+        self.assertTrue(game.is_over())
+
+    def test_check_win_at_matches_full_scan(self):
+        board = [0] * 36
+        for index in (7, 14, 21, 28):
+            board[index] = 2
+        self.assertEqual(Gomoku.check_win_at(board, 6, 4, 14), 2)
+        self.assertEqual(Gomoku.check_win_full(board, 6, 4), 2)
+        self.assertEqual(Gomoku.check_win_at(board, 6, 5, 14), 0)
+        self.assertEqual(Gomoku.check_win_full(board, 6, 5), 0)
+
+    def test_five_in_a_row(self):
+        game = Gomoku.Game()
+        for move in (0, 15, 1, 16, 2, 17, 3, 18):
+            self.assertEqual(game.play(move), 0)
+        self.assertEqual(game.play(4), 1)
+        self.assertRaises(ValueError, game.play, 5)
+
+
+class TestTicTacToeAI(unittest.TestCase):
+
+    def reachable_boards(self):
+        table = ai.get_table()
+        return [ai.decode_board(code) for code in range(ai.POSITIONS)
+                if table[code] != ai.UNREACHABLE]
+
+    def test_saved_table_matches_solve(self):
+        self.assertEqual(ai.solve(), ai.get_table())
+
+    def test_best_move_never_loses(self):
+        # perfect play for one side against every reply of the other
+        def explore(board, player, perfect):
+            winner = Tic_tac_toe.check_win(board)
+            if winner or 0 not in board:
+                return {winner}
+            if player == perfect:
+                moves = [ai.best_move(board)]
+            else:
+                moves = [m for m in range(9) if board[m] == 0]
+            outcomes = set()
+            for move in moves:
+                board[move] = player
+                outcomes |= explore(board, Tic_tac_toe.next_player(player), perfect)
+                board[move] = 0
+            return outcomes
+        self.assertEqual(explore([0] * 9, 1, perfect=1), {0, 1})
+        self.assertEqual(explore([0] * 9, 1, perfect=2), {0, 2})
+
+    def test_empty_board_is_a_draw(self):
+        self.assertEqual(ai.position_value([0] * 9), 0)
+        self.assertEqual(ai.Searcher().search([0] * 9)[0], 0)
+
+    def test_canonical_form_of_symmetric_copies(self):
+        board = [1, 2, 0, 0, 1, 0, 0, 0, 2]
+        code, perm = ai.canonical_form(board)
+        for symmetry in ai.SYMMETRIES:
+            copy = [board[symmetry[i]] for i in range(9)]
+            copy_code, copy_perm = ai.canonical_form(copy)
+            self.assertEqual(copy_code, code)
+            # the canonical board read back through perm is the copy
+            canonical = ai.decode_board(copy_code)
+            self.assertEqual([canonical[copy_perm.index(i)] for i in range(9)], copy)
+
+    def test_search_matches_solved_table(self):
+        searcher = ai.Searcher(ai.TranspositionTable(symmetric=True))
+        for board in self.reachable_boards():
+            value, move = searcher.search(board)
+            self.assertEqual(value, ai.position_value(board), board)
+            if move is None:
+                self.assertEqual(ai.best_move(board), None)
+                continue
+            board[move] = ai.player_to_move(board)
+            self.assertEqual(ai.position_value(board), -value, board)
+
+    def test_table_size_bound(self):
+        table = ai.TranspositionTable(max_size=10)
+        self.assertEqual(ai.Searcher(table).search([0] * 9)[0], 0)
+        stats = table.stats()
+        self.assertEqual(stats["size"], 10)
+        self.assertGreater(stats["evictions"], 0)
+
+
+class TestSelfPlay(unittest.TestCase):
+
+    def test_scripted_game(self):
+        strategies = (Tic_tac_toe.scripted_strategy([0, 1, 2]), Tic_tac_toe.scripted_strategy([3, 4, 5]))
+        self.assertEqual(Tic_tac_toe.play_game(strategies, show=False), 1)
+
+    def test_minimax_draws_itself(self):
+        report = Tic_tac_toe_selfplay.simulate(20, "minimax", "minimax", workers=1, seed=0)
+        self.assertEqual((report.games, report.draws), (20, 20))
+
+    def test_seeded_runs_match_across_workers(self):
+        one = Tic_tac_toe_selfplay.simulate(3000, workers=1, seed="s", chunk_games=500)
+        two = Tic_tac_toe_selfplay.simulate(3000, workers=2, seed="s", chunk_games=500)
+        self.assertEqual((one.draws, one.x_wins, one.o_wins), (two.draws, two.x_wins, two.o_wins))
+        self.assertEqual(one.games, 3000)
+        self.assertRaises(ValueError, Tic_tac_toe_selfplay.simulate, 10, "nobody")
+        self.assertRaises(ValueError, Tic_tac_toe_selfplay.simulate, 0)
+
+
+class TestRendering(unittest.TestCase):
+
+    def concatenated(self, board, width):
+        # the display_board loop that render_board replaced
+        text = ""
+        for i in range(len(board)):
+            if board[i] == 0:
+                text += str(i + 1)
+            else:
+                text += Tic_tac_toe.player_name(board[i])
+            text += "\n" if (i + 1) % width == 0 else " | "
+        return text
+
+    def test_matches_concatenation(self):
+        rng = random.Random(1)
+        for width in (3, 3, 4, 15):
+            for _ in range(50):
+                board = [rng.randrange(3) for _ in range(width * width)]
+                self.assertEqual(Tic_tac_toe.render_board(board, width), self.concatenated(board, width))
+
+    def test_display_to_stream(self):
+        out = io.StringIO()
+        Tic_tac_toe.display_board([1, 0, 2, 0, 0, 0, 0, 0, 0], stream=out)
+        self.assertEqual(out.getvalue(), "\nX | 2 | O\n4 | 5 | 6\n7 | 8 | 9\n\n")
+
+
+class TestBitboards(unittest.TestCase):
+
+    def test_matches_check_win(self):
+        table = ai.get_table()
+        for code in range(ai.POSITIONS):
+            if table[code] == ai.UNREACHABLE:
+                continue
+            board = ai.decode_board(code)
+            x_bits, o_bits = Tic_tac_toe.board_to_bits(board)
+            self.assertEqual(Tic_tac_toe.bits_to_board(x_bits, o_bits), board)
+            self.assertEqual(Tic_tac_toe.check_win_bits(x_bits, o_bits), Tic_tac_toe.check_win(board))
+
+    def test_win_table(self):
+        for mask in Tic_tac_toe.WIN_MASKS:
+            self.assertTrue(Tic_tac_toe.has_line(mask | 1 << 4))
+        self.assertEqual(sum(Tic_tac_toe.WIN_TABLE), sum(map(Tic_tac_toe.has_line, range(512))))
+        self.assertFalse(Tic_tac_toe.WIN_TABLE[0b011000110])
+
+
+class TestPetSimulation(unittest.TestCase):
+
+    def make_pets(self, seed, count=30):
+        random.seed(seed)
+        kinds = [lambda n: Tamagotchi.Dog(n, "woof"), lambda n: Tamagotchi.Cat(n, "meow", 2),
+                 lambda n: Tamagotchi.Poodle(n, "yo")]
+        return [kinds[i % 3](str(i)) for i in range(count)]
+
+    def test_matches_per_tick_stepping(self):
+        ticks, feed_every = 40, 4
+        events = []
+        sim = Tamagotchi_sim.PetSimulation(on_event=lambda *event: events.append(event))
+        for t in range(ticks):
+            ids = [sim.add_pet(pet) for pet in self.make_pets(t)]
+            for pet_id in range(t % feed_every, len(sim.pets), feed_every):
+                if not sim.left[pet_id]:
+                    sim.interact(pet_id, Tamagotchi.Pet.feed)
+            sim.run(1 if t < ticks - 1 else 30)
+        sim.sync_all()
+
+        # the same pets stepped one tick at a time
+        expected = []
+        pets, moods, left = [], [], []
+
+        def check(tick, pet_id):
+            pet = pets[pet_id]
+            if pet.has_left():
+                left[pet_id] = True
+                expected.append((tick, pet_id, Tamagotchi_sim.LEFT, pet.mood()))
+            elif pet.mood() != moods[pet_id]:
+                moods[pet_id] = pet.mood()
+                expected.append((tick, pet_id, Tamagotchi_sim.MOOD_CHANGED, pet.mood()))
+
+        for t in range(ticks + 29):
+            if t < ticks:
+                for pet in self.make_pets(t):
+                    pets.append(pet)
+                    moods.append(pet.mood())
+                    left.append(pet.has_left())
+                for pet_id in range(t % feed_every, len(pets), feed_every):
+                    if not left[pet_id]:
+                        pets[pet_id].feed()
+                        check(t, pet_id)
+            for pet_id, pet in enumerate(pets):
+                if not left[pet_id]:
+                    pet.clock_tick()
+                    check(t + 1, pet_id)
+
+        self.assertEqual(sorted(events), sorted(expected))
+        self.assertEqual(sim.events, len(expected))
+        self.assertEqual(sim.left, left)
+        self.assertEqual(sim.active, left.count(False))
+        for pet, other in zip(sim.pets, pets):
+            self.assertEqual((pet.hunger, pet.boredom, pet.age), (other.hunger, other.boredom, other.age))
+
+    def test_removed_pets_are_skipped(self):
+        events = []
+        sim = Tamagotchi_sim.PetSimulation(on_event=lambda *event: events.append(event))
+        pet_ids = [sim.add_pet(pet) for pet in self.make_pets(0, 10)]
+        for pet_id in pet_ids[::2]:
+            sim.remove(pet_id)
+        sim.run(50)
+        self.assertEqual(sim.active, 0)
+        self.assertFalse(any(pet_id % 2 == 0 for _, pet_id, _, _ in events))
+
+
+@unittest.skipIf(Tamagotchi_population is None, "needs NumPy")
+class TestPetPopulation(unittest.TestCase):
+
+    def test_matches_pet_objects(self):
+        random.seed(5)
+        pets = [kind(str(i), "...") for i, kind in enumerate([Tamagotchi.Dog, Tamagotchi.Poodle] * 20)]
+        pets += [Tamagotchi.Cat(str(i), "meow", 2) for i in range(20)]
+        population = Tamagotchi_population.PetPopulation.from_pets(pets)
+        for tick in range(12):
+            fed = [pet_id for pet_id in range(tick % 3, len(pets), 3) if not pets[pet_id].has_left()]
+            for pet_id in fed:
+                pets[pet_id].feed()
+            population.feed(fed)
+            for pet in pets:
+                if not pet.has_left():
+                    pet.clock_tick()
+            population.clock_tick()
+            moods = [Tamagotchi_population.MOODS[code] for code in population.mood()]
+            self.assertEqual(moods, [pet.mood() for pet in pets])
+            self.assertEqual(population.has_left().tolist(), [pet.has_left() for pet in pets])
+
+    def test_hydrate_and_store(self):
+        population = Tamagotchi_population.PetPopulation()
+        pet_id = population.add("cat", "tom", "meow", 3, hunger=4, boredom=2)
+        pet = population.hydrate(pet_id)
+        self.assertEqual((type(pet), pet.hunger, pet.boredom, pet.meow_count), (Tamagotchi.Cat, 4, 2, 3))
+        pet.feed()
+        pet.clock_tick(2)
+        population.store(pet_id, pet)
+        self.assertEqual((population.hunger[pet_id], population.boredom[pet_id], population.age[pet_id]),
+                         (4, 6, 6))
+
+
+class TestTamagotchiServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # a slow clock so no pet leaves during a test
+        self.server = Tamagotchi_server.TamagotchiServer(tick_seconds=60, seed=0)
+        self.port = await self.server.start()
+        self.client = Tamagotchi_server.Client()
+        await self.client.connect(port=self.port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_commands(self):
+        reply = await self.client.request("adopt poodle fifi yap")
+        self.assertTrue(reply["ok"])
+        self.assertIn("I'm fifi.", reply["output"])
+        reply = await self.client.request("speak fifi")
+        self.assertEqual(reply["output"], "Dancing in circles like poodles do!\n I say: yap arrrf!")
+        reply = await self.client.request("dance fifi")
+        self.assertEqual(reply["output"], "Dancing in circles like poodles do!")
+        reply = await self.client.request("feed fifi")
+        self.assertEqual(reply, {"ok": True, "output": ""})
+        reply = await self.client.request("jump fifi")
+        self.assertEqual(reply["output"], "Please provide a valid command.")
+        reply = await self.client.request("speak rex")
+        self.assertEqual(reply, {"ok": False, "error": "you have no pet called rex"})
+        reply = await self.client.request("adopt cat tom meow 2 extra")
+        self.assertFalse(reply["ok"])
+
+    async def test_bad_lines_keep_the_session(self):
+        await self.client.request("adopt dog rex woof")
+        self.client.writer.write(b"speak \xff\xfe rex\n")
+        reply = json.loads(await self.client.reader.readline())
+        self.assertFalse(reply["ok"])
+        self.assertIn("utf-8", reply["error"])
+        self.assertEqual(await self.client.request("pets"), {"ok": True, "output": "rex (happy)"})
+        self.assertEqual(await self.client.request("x" * 200000),
+                         {"ok": False, "error": "line too long"})
+        reply = await self.client.request("speak rex")
+        self.assertEqual(reply, {"ok": True, "output": "I say: woof arrrf!"})
+
+    async def test_events_are_pushed(self):
+        await self.client.request("adopt cat tom meow 2")
+        self.server.sim.run(100)
+        reply = await self.client.request("pets")
+        self.assertEqual(reply, {"ok": True, "output": ""})
+        self.assertEqual(self.client.events[-1]["event"], Tamagotchi_sim.LEFT)
+        self.assertEqual(self.client.events[-1]["pet"], "tom")
+
+    async def test_slow_reader_is_disconnected(self):
+        await self.client.request("adopt dog rex woof")
+        session, = self.server.sessions
+        session.max_buffer = 100000
+        # the client reads nothing while events pile up
+        event = {"event": "mood", "pet": "x" * 100000}
+        for _ in range(1000):
+            if session.writer.is_closing():
+                break
+            session.push(event)
+        self.assertTrue(session.writer.is_closing())
+
+
+if __name__ == "__main__":
+    unittest.main()
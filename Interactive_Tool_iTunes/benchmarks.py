@@ -0,0 +1,104 @@
+'''Benchmarks for building media objects from iTunes results
+
+Run with: python benchmarks.py
+'''
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import iTunes
+import media_index
+
+
+def make_results(count, seed=0):
+    '''returns count fake search results, mixing songs, movies and others'''
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        result = {"artistName": "Artist {}".format(i % 500), "collectionName": "Album {}".format(i % 900),
+                  "collectionViewUrl": "https://example.com/c/{}".format(i), "releaseDate": "19{:02d}-01-01T08:00:00Z".format(i % 100)}
+        kind = rng.choice(["song", "song", "feature-movie", None])
+        if kind is not None:
+            result["kind"] = kind
+            result["trackName"] = "Track {}".format(i)
+            result["trackViewUrl"] = "https://example.com/t/{}".format(i)
+            result["trackTimeMillis"] = rng.randrange(60000, 9000000)
+        if kind == "song":
+            result["primaryGenreName"] = "Rock"
+        elif kind == "feature-movie":
+            result["contentAdvisoryRating"] = "PG"
+        results.append(result)
+    return results
+
+
+def measure(build, results):
+    '''returns (objects per second, bytes per object) for build(results)'''
+    start = time.perf_counter()
+    build(results)
+    rate = len(results) / (time.perf_counter() - start)
+    tracemalloc.start()
+    objects = build(results)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return rate, size / len(results)
+
+
+def bench_construction(count=200000):
+    '''prints objects built per second and bytes per object with the
+    per-result constructors and with Media.from_results
+    '''
+    results = make_results(count)
+    builders = [("constructors", lambda rs: [iTunes.media_from_result(r) for r in rs]),
+                ("from_results", iTunes.Media.from_results)]
+    for name, build in builders:
+        rate, size = measure(build, results)
+        print("{:<14} {:>12.0f} objects/s {:>8.0f} bytes/object".format(name, rate, size))
+
+
+def bench_index(count=200000, queries=10000):
+    '''prints how long the offline index takes to build, save and load,
+    its size on disk, and queries per second before and after loading
+    '''
+    rng = random.Random(2)
+    vocabulary = ["word{}".format(i) for i in range(20000)]
+    records = []
+    for media in iTunes.Media.from_results(make_results(count)):
+        media.title = " ".join(rng.choices(vocabulary, k=3))
+        records.append(iTunes.media_to_dict(media))
+    words = [" ".join(rng.choices(vocabulary, k=2)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    index = media_index.MediaIndex()
+    index.add_all(records)
+    print("build {:>10.0f} records/s".format(count / (time.perf_counter() - start)))
+
+    def search(ix):
+        for query in words:
+            ix.search(query)
+
+    print("search (built)  {:>8.0f} queries/s".format(per_second(queries, lambda: search(index))))
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "index.bin")
+        start = time.perf_counter()
+        index.save(filename)
+        print("save {:>8.3f}s {:>8.1f} MB".format(time.perf_counter() - start, os.path.getsize(filename) / 1e6))
+        start = time.perf_counter()
+        loaded = media_index.MediaIndex.load(filename)
+        print("load {:>8.3f}s".format(time.perf_counter() - start))
+        print("search (loaded) {:>8.0f} queries/s".format(per_second(queries, lambda: search(loaded))))
+        loaded.close()
+
+
+def per_second(count, func):
+    '''runs func() once and returns count divided by the elapsed time'''
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    bench_construction()
+    bench_index()
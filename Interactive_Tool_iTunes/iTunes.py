@@ -1,9 +1,26 @@
+import argparse
 import json
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
 import webbrowser
+import media_index
+
+BASE_URL = "https://itunes.apple.com/search"
+CACHE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "itunes_cache.sqlite")
+CACHE_TTL = 24 * 60 * 60 # seconds a cached response stays valid
+CACHE_MAX_ENTRIES = 10000
+CACHE_MEMORY_ENTRIES = 256
+INDEX_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "itunes_index.bin")
+PAGE_SIZE = 50 # results per request in paged mode; the API allows up to 200
 
 # Part 1 & 2
 class Media:
+    __slots__ = ("title", "author", "release_year", "url")
 
     def __init__(self, title="No Title", author="No Author", release_year="No Release Year", url="No URL", json = None):
         if json == None:
@@ -12,13 +29,41 @@ class Media:
             self.release_year = release_year
             self.url = url
         else:
-            if "trackName" in json.keys():
-                self.title = json["trackName"]
-            else:
-                self.title = json["collectionName"]
-            self.author = json["artistName"]
-            self.url = json["collectionViewUrl"]
-            self.release_year = json["releaseDate"][0:4]
+            self.load_json(json)
+
+    def load_json(self, json):
+        ''' sets every field from one iTunes result in a single pass '''
+        self.title = json["trackName"] if "trackName" in json else json["collectionName"]
+        self.author = json["artistName"]
+        self.url = json["collectionViewUrl"]
+        self.release_year = json["releaseDate"][0:4]
+
+    @classmethod
+    def from_results(cls, results):
+        ''' builds a Song, Movie or Media for each iTunes result, picking
+        the class from MEDIA_KINDS by the result's "kind"
+
+        The objects are filled in by load_json() directly, skipping the
+        keyword defaults of __init__.
+
+        Parameters
+        ----------
+        results: list
+            the "results" list of a search response
+
+        Returns
+        -------
+        list
+            the media objects, in the same order
+        '''
+        kinds = MEDIA_KINDS
+        new = object.__new__
+        objects = []
+        for result in results:
+            media = new(kinds.get(result.get("kind"), Media))
+            media.load_json(result)
+            objects.append(media)
+        return objects
 
     def info(self):
 
@@ -29,6 +74,7 @@ class Media:
         return 0
 
 class Song(Media):
+    __slots__ = ("album", "genre", "track_length")
 
     def __init__(self, title="No Title", author="No Author", release_year="No Release Year", url="No URL",\
                  album="No Album", genre="No Genre", track_length=0, json=None):
@@ -37,12 +83,15 @@ class Song(Media):
             self.album = album
             self.genre = genre
             self.track_length = track_length
-        else:
-            self.url = json["trackViewUrl"]
-            self.title = json["trackName"]
-            self.album = json["collectionName"]
-            self.genre = json["primaryGenreName"]
-            self.track_length = int(json["trackTimeMillis"])
+
+    def load_json(self, json):
+        self.title = json["trackName"]
+        self.author = json["artistName"]
+        self.url = json["trackViewUrl"]
+        self.release_year = json["releaseDate"][0:4]
+        self.album = json["collectionName"]
+        self.genre = json["primaryGenreName"]
+        self.track_length = int(json["trackTimeMillis"])
 
     def info(self):
 
@@ -53,17 +102,21 @@ class Song(Media):
         return round(self.track_length / 1000)
 
 class Movie(Media):
+    __slots__ = ("rating", "movie_length")
 
     def __init__(self, title="No Title", author="No Author", release_year="No Release Year", url="No URL", rating="No Rating", movie_length=0, json = None):
         super().__init__(title, author, release_year, url, json)
         if json == None:
             self.rating = rating
             self.movie_length = movie_length
-        else:
-            self.url = json["trackViewUrl"]
-            self.title = json["trackName"]
-            self.rating = json["contentAdvisoryRating"]
-            self.movie_length = int(json["trackTimeMillis"])
+
+    def load_json(self, json):
+        self.title = json["trackName"]
+        self.author = json["artistName"]
+        self.url = json["trackViewUrl"]
+        self.release_year = json["releaseDate"][0:4]
+        self.rating = json["contentAdvisoryRating"]
+        self.movie_length = int(json["trackTimeMillis"])
 
     def info(self):
 
@@ -73,10 +126,606 @@ class Movie(Media):
 
         return round(self.movie_length / 60000)
 
+# "kind" of a search result -> class; anything else is a plain Media
+MEDIA_KINDS = {"song": Song, "feature-movie": Movie}
+
 # Other classes, functions, etc. should go here
 
+def construct_unique_key(baseurl, params):
+    ''' constructs a key that uniquely and repeatably identifies a search
+    by its baseurl and params. The search term is lower-cased and its
+    whitespace collapsed, so "The  Beatles" and "the beatles" share a key.
+
+    Parameters
+    ----------
+    baseurl: string
+        The URL for the API endpoint
+    params: dict
+        A dictionary of param:value pairs
+
+    Returns
+    -------
+    string
+        the unique key as a string
+    '''
+    param_strings = []
+    connector = '_'
+
+    for k in params.keys():
+        value = params[k]
+        if k == "term":
+            value = " ".join(str(value).lower().split())
+        param_strings.append(f'{k}_{value}')
+    param_strings.sort()
+    return baseurl + connector + connector.join(param_strings)
+
+
+class ResponseCache:
+    ''' A two-tier cache of search responses.
+
+    Responses are stored in an SQLite file so they survive restarts, and
+    the most recently used ones are also kept decoded in memory, so a
+    repeated search is a dict lookup. Every entry expires ttl seconds
+    after it was fetched. When the file holds more than max_entries
+    responses, the least recently used ones are evicted. Recency on disk
+    is updated when an entry is read from disk, not on memory hits.
+
+    Attributes
+    ----------
+    filename: string
+        the cache file; ":memory:" keeps nothing on disk
+    ttl: float
+        seconds an entry stays valid
+    max_entries: int
+        entries kept on disk
+    memory_entries: int
+        entries kept in the in-memory tier
+    memory_hits, disk_hits, misses, expired, evictions, stores: int
+        counters, see stats()
+    '''
+
+    def __init__(self, filename=CACHE_FILENAME, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES,
+                 memory_entries=CACHE_MEMORY_ENTRIES, clock=time.time):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.clock = clock
+        self.memory = OrderedDict() # key -> (expires, data)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.stores = 0
+        self.db = sqlite3.connect(filename)
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses "
+                        "(key TEXT PRIMARY KEY, expires REAL, used REAL, data TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self.db.commit()
+
+    def remember(self, key, expires, data):
+        '''puts an entry in the in-memory tier, dropping the oldest'''
+        self.memory[key] = (expires, data)
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        ''' looks a key up in memory, then on disk
+
+        Parameters
+        ----------
+        key: string
+            from construct_unique_key()
+
+        Returns
+        -------
+        dict or None
+            the cached response, or None if missing or expired
+        '''
+        now = self.clock()
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self.memory_hits += 1
+                self.memory.move_to_end(key)
+                return entry[1]
+            del self.memory[key]
+        row = self.db.execute("SELECT expires, data FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        expires, text = row
+        if expires <= now:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.db.commit()
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        self.db.commit()
+        self.disk_hits += 1
+        data = json.loads(text)
+        self.remember(key, expires, data)
+        return data
+
+    def put(self, key, data):
+        ''' stores a response under key in both tiers, evicting the least
+        recently used entries beyond max_entries
+
+        Parameters
+        ----------
+        key: string
+            from construct_unique_key()
+        data: dict
+            the decoded response
+        '''
+        now = self.clock()
+        expires = now + self.ttl
+        self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                        (key, expires, now, json.dumps(data)))
+        extra = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if extra > 0:
+            for (old_key,) in self.db.execute("SELECT key FROM responses ORDER BY used LIMIT ?",
+                                              (extra,)).fetchall():
+                self.db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                self.memory.pop(old_key, None)
+            self.evictions += extra
+        self.db.commit()
+        self.stores += 1
+        self.remember(key, expires, data)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def responses(self):
+        '''yields every unexpired response on disk, without touching counters'''
+        rows = self.db.execute("SELECT data FROM responses WHERE expires > ?", (self.clock(),))
+        for (text,) in rows.fetchall():
+            yield json.loads(text)
+
+    def clear(self):
+        '''removes every entry from both tiers'''
+        self.memory.clear()
+        self.db.execute("DELETE FROM responses")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def stats(self):
+        '''returns the counters, sizes and hit rate as a dict'''
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {"memory_size": len(self.memory), "disk_size": len(self),
+                "memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "expired": self.expired,
+                "evictions": self.evictions, "stores": self.stores,
+                "hit_rate": hits / lookups if lookups else 0.0}
+
+
+CACHE = None
+
+
+def get_cache():
+    '''returns the shared ResponseCache, opening it on first use'''
+    global CACHE
+    if CACHE is None:
+        CACHE = ResponseCache()
+    return CACHE
+
+
+def search_itunes(term, params=None, cache=None, index=None, session=None):
+    ''' searches iTunes for a term, using the cache when possible
+
+    Parameters
+    ----------
+    term: string
+        the keyword(s) to search for
+    params: dict (optional)
+        extra search parameters, e.g. {"limit": 50}
+    cache: ResponseCache (optional)
+        defaults to get_cache()
+    index: media_index.MediaIndex (optional)
+        newly fetched results are added to it
+    session: requests.Session (optional)
+        makes the request; defaults to the requests module
+
+    Returns
+    -------
+    dict
+        the decoded response, with a "results" list
+
+    Raises
+    ------
+    requests.RequestException, ValueError
+        see fetch() and read_results(); failed searches are not cached
+    '''
+    if cache is None:
+        cache = get_cache()
+    params = dict(params or {}, term=term)
+    key = construct_unique_key(BASE_URL, params)
+    response = cache.get(key)
+    if response is None:
+        response = fetch(requests if session is None else session, params)
+        media = read_results(response["results"])
+        cache.put(key, response)
+        if index is not None:
+            index.add_all(media_to_dict(item) for item in media)
+    return response
+
+
+def iter_pages(term, page_size=PAGE_SIZE, params=None, cache=None, index=None):
+    ''' searches page by page with limit/offset, fetching each page only
+    when the previous one has been consumed
+
+    Parameters
+    ----------
+    term: string
+        the keyword(s) to search for
+    page_size: int (optional)
+        results per request
+    params: dict (optional)
+        extra search parameters
+    cache, index: (optional)
+        passed to search_itunes()
+
+    Yields
+    ------
+    list
+        the media objects of one page; the last page may be shorter
+    '''
+    offset = 0
+    while True:
+        query = dict(params or {}, limit=page_size, offset=offset)
+        results = search_itunes(term, query, cache, index)["results"]
+        if results:
+            yield read_results(results)
+        if len(results) < page_size:
+            return
+        offset += page_size
+
+
+def iter_media(term, page_size=PAGE_SIZE, max_results=None, params=None, cache=None, index=None):
+    ''' yields media objects one at a time across pages, stopping after
+    max_results (None for no limit). Only one page is held at a time.
+    params, cache and index are passed to iter_pages().
+    '''
+    if max_results is not None and max_results <= 0:
+        return
+    count = 0
+    for page in iter_pages(term, page_size, params, cache, index):
+        for media in page:
+            yield media
+            count += 1
+            if count == max_results:
+                return
+
+
+def print_sections(songs, movies, others, start=1, show_empty=True):
+    ''' prints songs, movies and other media under their headings,
+    numbered from start
+
+    Parameters
+    ----------
+    songs, movies, others: list
+        the media objects of each category
+    start: int (optional)
+        the number of the first item printed
+    show_empty: bool (optional)
+        print "No ... found." for empty categories
+
+    Returns
+    -------
+    list
+        the urls of the printed items, in numbering order
+    '''
+    if len(songs) != 0:
+        print("\nSONGS\n")
+        for i in range(len(songs)):
+            print("{} {}".format(start + i, songs[i].info()))
+    elif show_empty:
+        print("\nSONGS\nNo songs found.\n")
+    if len(movies) != 0:
+        print("\nMOVIES\n")
+        for i in range(len(movies)):
+            print("{} {}".format(start + len(songs) + i, movies[i].info()))
+    elif show_empty:
+        print("\nMOVIES\nNo movies found.\n")
+    if len(others) != 0:
+        print("\nOTHER MEDIA\n")
+        for i in range(len(others)):
+            print("{} {}".format(start + len(songs) + len(movies) + i, others[i].info()))
+    elif show_empty:
+        print('OTHER MEDIA\nNo other media found.\n')
+    return [media.url for media in songs + movies + others]
+
+
+def split_kinds(media_list):
+    '''returns (songs, movies, others) from a list of media objects'''
+    songs = []
+    movies = []
+    others = []
+    for media in media_list:
+        if type(media) is Song:
+            songs.append(media)
+        elif type(media) is Movie:
+            movies.append(media)
+        else:
+            others.append(media)
+    return songs, movies, others
+
+
+def print_paged(term, page_size=PAGE_SIZE, max_results=None, more=None, cache=None, index=None):
+    ''' prints search results one page at a time as they arrive
+
+    Each page is printed by category as soon as it is fetched, numbered
+    on from the previous page, and then dropped; only the urls are kept
+    for opening results by number.
+
+    Parameters
+    ----------
+    term: string
+        the keyword(s) to search for
+    page_size: int (optional)
+        results per request
+    max_results: int (optional)
+        stop after this many results
+    more: function (optional)
+        called after each full page; return False to stop early
+    cache, index: (optional)
+        passed to search_itunes()
+
+    Returns
+    -------
+    list
+        the urls of all printed results, in numbering order
+    '''
+    urls = []
+    for page in iter_pages(term, page_size, cache=cache, index=index):
+        last = len(page) < page_size # a short page ends the results
+        if max_results is not None:
+            page = page[:max_results - len(urls)]
+        urls += print_sections(*split_kinds(page), start=len(urls) + 1, show_empty=not urls)
+        if last or max_results is not None and len(urls) >= max_results:
+            break
+        if more is not None and not more():
+            break
+    if not urls:
+        print_sections([], [], [])
+    return urls
+
+
+def read_results(results):
+    ''' Media.from_results(), raising ValueError rather than KeyError or
+    TypeError when a result has missing or malformed fields
+    '''
+    try:
+        return Media.from_results(results)
+    except (KeyError, TypeError) as e:
+        raise ValueError("unreadable result: {!r}".format(e)) from e
+
+
+def media_from_result(result):
+    ''' builds a Song, Movie or Media from one entry of a response's
+    "results", depending on its "kind"
+    '''
+    return MEDIA_KINDS.get(result.get("kind"), Media)(json=result)
+
+
+def media_to_dict(media):
+    '''returns a media object's fields as a dict, with its class as "type"'''
+    record = {"type": type(media).__name__}
+    for cls in reversed(type(media).__mro__):
+        for name in getattr(cls, "__slots__", ()):
+            record[name] = getattr(media, name)
+    return record
+
+
+MEDIA_TYPES = {"Media": Media, "Song": Song, "Movie": Movie}
+
+
+def media_from_dict(record):
+    '''rebuilds a media object from a media_to_dict() record'''
+    media = object.__new__(MEDIA_TYPES[record["type"]])
+    for name, value in record.items():
+        if name != "type":
+            setattr(media, name, value)
+    return media
+
+
+def index_results(index, results):
+    '''adds the media of a response's "results" to a MediaIndex'''
+    return index.add_all(media_to_dict(media) for media in read_results(results))
+
+
+def build_index(cache):
+    '''returns a new MediaIndex of every readable response in a ResponseCache'''
+    index = media_index.MediaIndex()
+    for response in cache.responses():
+        try:
+            index_results(index, response.get("results", []))
+        except ValueError:
+            continue
+    return index
+
+
+def get_index(filename=INDEX_FILENAME):
+    '''loads the saved index, or builds one from the cache if there is none'''
+    try:
+        return media_index.MediaIndex.load(filename)
+    except (OSError, ValueError):
+        return build_index(get_cache())
+
+
+def search_offline(index, query, limit=50):
+    '''returns the media in index that best match query, best first'''
+    return [media_from_dict(record) for score, record in index.search(query, limit)]
+
+
+def make_session(workers):
+    '''returns a requests.Session whose connection pool fits workers threads'''
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch(session, params):
+    '''runs one search request; called from worker threads
+
+    Raises
+    ------
+    requests.RequestException
+        if the request fails or returns an error status
+    ValueError
+        if the body is not JSON with a "results" list
+    '''
+    response = session.get(BASE_URL, params=params, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, dict) or "results" not in data:
+        raise ValueError("no results in response: {:.200}".format(json.dumps(data)))
+    return data
+
+
+class BatchReport:
+    ''' results of a batch_search() run
+
+    Attributes
+    ----------
+    queries: int
+        search terms processed
+    cached: int
+        terms answered from the cache
+    errors: int
+        terms whose request failed
+    results: int
+        media records written
+    seconds: float
+        wall-clock time
+    '''
+
+    def __init__(self):
+        self.queries = 0
+        self.cached = 0
+        self.errors = 0
+        self.results = 0
+        self.seconds = 0.0
+
+    def queries_per_second(self):
+        return self.queries / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return "{} queries ({} cached, {} errors), {} results in {:.2f}s: {:.1f} queries/s".format(
+            self.queries, self.cached, self.errors, self.results, self.seconds, self.queries_per_second())
+
+
+def batch_search(terms, out, workers=8, params=None, cache=None, session=None, index=None):
+    ''' searches many terms concurrently and writes every result to out
+    as JSON Lines, one {"term": ..., "type": ..., fields...} object per
+    media record (or {"term": ..., "error": ...} for a failed search or
+    a response that cannot be read; a term is written whole or not at all)
+
+    Network requests run on a pool of workers threads sharing one
+    pooled session. The cache is only touched from the calling thread,
+    and at most 2 * workers requests are queued at once, so memory stays
+    flat however many terms there are. Lines are written as responses
+    arrive, so their order can differ from terms.
+
+    Parameters
+    ----------
+    terms: iterable of string
+        the search terms; blank ones are skipped
+    out: file
+        where to write the JSON Lines
+    workers: int (optional)
+        the most requests in flight at once
+    params: dict (optional)
+        extra search parameters for every term
+    cache: ResponseCache (optional)
+        defaults to get_cache()
+    session: requests.Session (optional)
+        defaults to make_session(workers)
+    index: media_index.MediaIndex (optional)
+        newly fetched results are added to it
+
+    Returns
+    -------
+    BatchReport
+    '''
+    if cache is None:
+        cache = get_cache()
+    if session is None:
+        session = make_session(workers)
+    report = BatchReport()
+    start = time.perf_counter()
+
+    def fail(term, error):
+        report.errors += 1
+        out.write(json.dumps({"term": term, "error": error}) + "\n")
+
+    def write(term, response, fetched):
+        # each result is built once, for both the output and the index
+        try:
+            records = [media_to_dict(media) for media in read_results(response["results"])]
+        except ValueError as e:
+            fail(term, str(e))
+            return
+        if fetched and index is not None:
+            index.add_all(records)
+        for record in records:
+            line = {"term": term}
+            line.update(record)
+            out.write(json.dumps(line) + "\n")
+        report.results += len(records)
+
+    def finish(done):
+        for future in done:
+            term, key = pending.pop(future)
+            try:
+                response = future.result()
+            except (requests.RequestException, ValueError) as e:
+                fail(term, str(e))
+                continue
+            cache.put(key, response)
+            write(term, response, fetched=True)
+
+    pending = {}
+    with ThreadPoolExecutor(workers) as pool:
+        for term in terms:
+            term = term.strip()
+            if not term:
+                continue
+            report.queries += 1
+            query = dict(params or {}, term=term)
+            key = construct_unique_key(BASE_URL, query)
+            response = cache.get(key)
+            if response is not None:
+                report.cached += 1
+                write(term, response, fetched=False)
+                continue
+            pending[pool.submit(fetch, session, query)] = (term, key)
+            if len(pending) >= 2 * workers:
+                finish(wait(pending, return_when=FIRST_COMPLETED).done)
+        while pending:
+            finish(wait(pending, return_when=FIRST_COMPLETED).done)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
 #part 3 & 4
-if __name__ == "__main__":
+def ask_more():
+    return input("Show more results? Y/N ").strip().lower() == "y"
+
+
+def interactive(page_size=None, offline=False):
+    ''' runs the interactive search loop; with a page_size, results are
+    fetched and printed a page at a time. Everything fetched is added to
+    the offline index, which offline=True searches instead of iTunes.
+    '''
+    index = get_index()
 
     search = input("What would you like to search? Enter a keyword to search or 'exit' to quit:")
     while True:
@@ -84,54 +733,53 @@ if __name__ == "__main__":
             break
 
         elif search.isnumeric() is False:
-            itunes = "https://itunes.apple.com/search?term="
-            response = requests.get(itunes + search.replace(" ", "+")).json() ##一定要有json,这样得到的才是dic
-
-            songs = []
-            movies = []
-            others = []
-            for i in response["results"]:
-                if "kind" not in i.keys():
-                    others.append(Media(json=i))
-                elif i["kind"] == "song":
-                    songs.append(Song(json=i))
-                elif i["kind"] == "feature-movie":
-                    movies.append(Movie(json=i))
+            try:
+                if offline:
+                    urls = print_sections(*split_kinds(search_offline(index, search)))
+                elif page_size is None:
+                    response = search_itunes(search, index=index)
+                    urls = print_sections(*split_kinds(read_results(response["results"])))
                 else:
-                    others.append(Media(json=i))
-
-            if len(songs) != 0:
-                print("\nSONGS\n")
-                for i in range(len(songs)):
-                    print("{} {}".format(i + 1, songs[i].info()))
-            else:
-                print("\nSONGS\nNo songs found.\n")
-            if len(movies) != 0:
-                print("\nMOVIES\n")
-                for i in range(len(movies)):
-                    print("{} {}".format(len(songs) + 1 + i, movies[i].info()))
-            else:
-                print("\nMOVIES\nNo movies found.\n")
-            if len(others) != 0:
-                print("\nOTHER MEDIA\n")
-                for i in range(len(others)):
-                    print("{} {}".format(len(songs) + len(movies) + 1 + i, others[i].info()))
-            else:
-                print('OTHER MEDIA\nNo other media found.\n')
+                    urls = print_paged(search, page_size, more=ask_more, index=index)
+            except (requests.RequestException, KeyError, TypeError, ValueError) as e:
+                print("Search failed: {}\n".format(e))
+                urls = []
 
         elif search.isnumeric():
-            search_list = []
-            search_list = songs + movies + others
-            if len(search_list) >= int(search):
-                web_url = search_list[int(search) - 1].url
+            if len(urls) >= int(search):
+                web_url = urls[int(search) - 1]
                 print("Launching {} in web browser...\n".format(web_url))
                 webbrowser.open_new_tab(web_url)
             else:
-                print("Invalid input: please try another number no more than {}. \n".format(len(search_list)))
+                print("Invalid input: please try another number no more than {}. \n".format(len(urls)))
 
         else:
             break
 
         search = input("Enter the index number to view detail, or another keyword for a new search, or 'exit' to quit: ")
 
+    index.save(INDEX_FILENAME)
     print('Bye!')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the iTunes store")
+    parser.add_argument("--batch", metavar="FILE", help="search every line of FILE and write JSON Lines")
+    parser.add_argument("--output", metavar="FILE", help="JSON Lines output (default stdout)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests in batch mode")
+    parser.add_argument("--page-size", type=int, default=None,
+                        help="fetch and print interactive results this many at a time")
+    parser.add_argument("--offline", action="store_true",
+                        help="search the local index of fetched results instead of iTunes")
+    args = parser.parse_args()
+    if args.batch is None:
+        interactive(args.page_size, args.offline)
+    else:
+        index = get_index()
+        with open(args.batch) as terms:
+            out = open(args.output, "w") if args.output else sys.stdout
+            report = batch_search(terms, out, args.workers, index=index)
+            if args.output:
+                out.close()
+        index.save(INDEX_FILENAME)
+        print(report, file=sys.stderr)
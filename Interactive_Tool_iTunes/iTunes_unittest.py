@@ -1,6 +1,12 @@
 import unittest
+import unittest.mock
+import contextlib
+import io
 import json
+import os
+import tempfile
 import iTunes as proj1
+import media_index
 
 
 ####################
@@ -149,4 +155,312 @@ class TestJson(unittest.TestCase):
 		self.assertEqual(m.info(), "Jaws by Steven Spielberg (1975) [PG]")
 		self.assertEqual(m.length(), 124)
 
+class TestFromResults(unittest.TestCase):
+
+	def testDispatch(self):
+		song = {"kind": "song", "trackName": "Hey Jude", "artistName": "The Beatles", "collectionName": "1",
+			"collectionViewUrl": "c", "trackViewUrl": "t", "releaseDate": "1968-08-26T07:00:00Z",
+			"primaryGenreName": "Rock", "trackTimeMillis": 431333}
+		movie = {"kind": "feature-movie", "trackName": "Jaws", "artistName": "Steven Spielberg",
+			"collectionViewUrl": "c", "trackViewUrl": "t", "releaseDate": "1975-06-20T07:00:00Z",
+			"contentAdvisoryRating": "PG", "trackTimeMillis": 7451455}
+		book = {"collectionName": "Bridget Jones's Diary", "artistName": "Helen Fielding",
+			"collectionViewUrl": "c", "releaseDate": "2012-05-01T07:00:00Z"}
+		s, m, b = proj1.Media.from_results([song, movie, book])
+		self.assertEqual(type(s), proj1.Song)
+		self.assertEqual(type(m), proj1.Movie)
+		self.assertEqual(type(b), proj1.Media)
+		self.assertEqual(s.info(), proj1.Song(json=song).info())
+		self.assertEqual(s.url, "t")
+		self.assertEqual(m.info(), "Jaws by Steven Spielberg (1975) [PG]")
+		self.assertEqual(m.length(), 124)
+		self.assertEqual(b.info(), "Bridget Jones's Diary by Helen Fielding (2012)")
+		self.assertRaises(AttributeError, lambda: b.album)
+		self.assertFalse(hasattr(s, "__dict__"))
+
+
+####################
+###### Caching #####
+####################
+
+class FakeClock:
+
+	def __init__(self):
+		self.now = 1000.0
+
+	def __call__(self):
+		return self.now
+
+class TestCache(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.filename = os.path.join(self.dir.name, "cache.sqlite")
+		self.clock = FakeClock()
+		self.cache = proj1.ResponseCache(self.filename, ttl=60, max_entries=3, memory_entries=2, clock=self.clock)
+
+	def tearDown(self):
+		self.cache.close()
+		self.dir.cleanup()
+
+	def testKey(self):
+		k1 = proj1.construct_unique_key(proj1.BASE_URL, {"term": "The  Beatles", "limit": 5})
+		k2 = proj1.construct_unique_key(proj1.BASE_URL, {"limit": 5, "term": "the beatles"})
+		k3 = proj1.construct_unique_key(proj1.BASE_URL, {"term": "the beatles"})
+		self.assertEqual(k1, k2)
+		self.assertNotEqual(k1, k3)
+
+	def testHitAndMiss(self):
+		self.assertIsNone(self.cache.get("a"))
+		self.cache.put("a", {"results": [1]})
+		self.assertEqual(self.cache.get("a"), {"results": [1]})
+		stats = self.cache.stats()
+		self.assertEqual(stats["misses"], 1)
+		self.assertEqual(stats["memory_hits"], 1)
+		self.assertEqual(stats["stores"], 1)
+
+	def testTtl(self):
+		self.cache.put("a", {"results": []})
+		self.clock.now += 61
+		self.assertIsNone(self.cache.get("a"))
+		self.assertEqual(self.cache.stats()["expired"], 1)
+		self.assertEqual(len(self.cache), 0)
+
+	def testLruEviction(self):
+		for key in "abc":
+			self.cache.put(key, {"results": [key]})
+			self.clock.now += 1
+		self.cache.memory.clear()
+		self.assertEqual(self.cache.get("a"), {"results": ["a"]}) # a is now newer than b
+		self.cache.put("d", {"results": ["d"]})
+		self.assertEqual(self.cache.stats()["evictions"], 1)
+		self.assertEqual(len(self.cache), 3)
+		self.assertIsNone(self.cache.get("b"))
+		self.assertIsNotNone(self.cache.get("a"))
+
+	def testPersistence(self):
+		self.cache.put("a", {"results": ["a"]})
+		self.cache.close()
+		self.cache = proj1.ResponseCache(self.filename, ttl=60, clock=self.clock)
+		self.assertEqual(self.cache.get("a"), {"results": ["a"]})
+		self.assertEqual(self.cache.get("a"), {"results": ["a"]})
+		self.assertEqual(self.cache.stats()["disk_hits"], 1)
+		self.assertEqual(self.cache.stats()["memory_hits"], 1)
+
+	def testSearchUsesCache(self):
+		key = proj1.construct_unique_key(proj1.BASE_URL, {"term": "hey jude"})
+		self.cache.put(key, {"resultCount": 0, "results": []})
+		self.assertEqual(proj1.search_itunes("Hey Jude", cache=self.cache)["resultCount"], 0)
+
+	def testErrorsAreNotCached(self):
+		for data in [{"errorMessage": "Invalid value(s) for key(s): [limit]"}, ["not", "a", "dict"]]:
+			session = FakeSession(data)
+			self.assertRaises(ValueError, proj1.search_itunes, "hey jude", cache=self.cache, session=session)
+			self.assertEqual(len(self.cache), 0)
+		response = proj1.search_itunes("hey jude", cache=self.cache, session=FakeSession())
+		self.assertEqual(response["resultCount"], 1)
+		self.assertEqual(len(self.cache), 1)
+
+	def testUnreadableResultsAreNotCached(self):
+		movie = {"kind": "feature-movie", "trackName": "Jaws", "artistName": "Steven Spielberg",
+			"collectionViewUrl": "u", "trackViewUrl": "t", "releaseDate": "1975-06-20", "trackTimeMillis": 1000}
+		index = media_index.MediaIndex()
+		session = FakeSession({"resultCount": 1, "results": [movie]}) # no contentAdvisoryRating
+		self.assertRaises(ValueError, proj1.search_itunes, "jaws", cache=self.cache, index=index, session=session)
+		self.assertEqual((len(self.cache), len(index)), (0, 0))
+		# a bad response cached by an older version is reported, not raised as KeyError
+		key = proj1.construct_unique_key(proj1.BASE_URL, {"term": "jaws"})
+		self.cache.put(key, session.data)
+		self.assertEqual(len(proj1.build_index(self.cache)), 0)
+		inputs = iter(["jaws", "exit"])
+		out = io.StringIO()
+		with unittest.mock.patch.object(proj1, "get_index", return_value=index), \
+				unittest.mock.patch.object(proj1, "get_cache", return_value=self.cache), \
+				unittest.mock.patch.object(index, "save") as save, \
+				unittest.mock.patch("builtins.input", lambda prompt="": next(inputs)), \
+				contextlib.redirect_stdout(out):
+			proj1.interactive()
+		self.assertIn("Search failed: unreadable result: KeyError('contentAdvisoryRating')", out.getvalue())
+		save.assert_called_once_with(proj1.INDEX_FILENAME)
+
+class FakeResponse:
+
+	def __init__(self, data):
+		self.data = data
+
+	def raise_for_status(self):
+		pass
+
+	def json(self):
+		return self.data
+
+class FakeSession:
+
+	def __init__(self, data=None):
+		self.terms = []
+		self.data = data
+
+	def get(self, url, params=None, timeout=None):
+		self.terms.append(params["term"])
+		if self.data is not None:
+			return FakeResponse(self.data)
+		song = {"kind": "song", "trackName": params["term"], "artistName": "A", "collectionName": "C",
+			"collectionViewUrl": "u", "trackViewUrl": "t", "releaseDate": "2001-01-01",
+			"primaryGenreName": "Rock", "trackTimeMillis": 1000}
+		return FakeResponse({"resultCount": 1, "results": [song]})
+
+class TestBatch(unittest.TestCase):
+
+	def testBatchSearch(self):
+		cache = proj1.ResponseCache(":memory:")
+		session = FakeSession()
+		out = io.StringIO()
+		terms = ["hey jude\n", "\n", "yesterday\n", "Hey  Jude\n"] + ["song {}\n".format(i) for i in range(50)]
+		report = proj1.batch_search(terms, out, workers=4, cache=cache, session=session)
+		records = [json.loads(line) for line in out.getvalue().splitlines()]
+		self.assertEqual(report.queries, 53)
+		self.assertEqual(report.results, 53)
+		self.assertEqual(report.errors, 0)
+		self.assertEqual(len(records), 53)
+		self.assertEqual(records[0]["type"], "Song")
+		self.assertEqual(sorted(r["title"] for r in records if r["term"] == "yesterday"), ["yesterday"])
+		# "Hey  Jude" may share the key of a request still in flight
+		self.assertGreaterEqual(len(session.terms), 52)
+		report = proj1.batch_search(["yesterday"], io.StringIO(), cache=cache, session=session)
+		self.assertEqual(report.cached, 1)
+
+	def testBadResultsArePerTerm(self):
+		cache = proj1.ResponseCache(":memory:")
+		movie = {"kind": "feature-movie", "trackName": "Jaws", "artistName": "S", "trackViewUrl": "j",
+			"releaseDate": "1975", "trackTimeMillis": 1000} # no contentAdvisoryRating
+		cache.put(proj1.construct_unique_key(proj1.BASE_URL, {"term": "jaws"}), {"results": [movie]})
+		index = media_index.MediaIndex()
+		out = io.StringIO()
+		report = proj1.batch_search(["jaws", "hey jude"], out, cache=cache, session=FakeSession(), index=index)
+		records = [json.loads(line) for line in out.getvalue().splitlines()]
+		self.assertEqual(report.errors, 1)
+		self.assertEqual(report.results, 1)
+		self.assertEqual(records[0]["term"], "jaws")
+		self.assertIn("contentAdvisoryRating", records[0]["error"])
+		self.assertEqual(records[1]["title"], "hey jude")
+		self.assertEqual(len(index), 1)
+		session = FakeSession({"results": [movie]})
+		out = io.StringIO()
+		report = proj1.batch_search(["jaws 2"], out, cache=cache, session=session, index=index)
+		self.assertEqual(report.errors, 1)
+		self.assertEqual(json.loads(out.getvalue())["term"], "jaws 2")
+
+class TestPaging(unittest.TestCase):
+
+	def setUp(self):
+		self.cache = proj1.ResponseCache(":memory:")
+		book = {"collectionName": "Book", "artistName": "A", "collectionViewUrl": "c", "releaseDate": "2000"}
+		for offset, count in [(0, 2), (2, 2), (4, 1)]:
+			key = proj1.construct_unique_key(proj1.BASE_URL, {"term": "x", "limit": 2, "offset": offset})
+			self.cache.put(key, {"results": [dict(book, collectionViewUrl=str(offset + i)) for i in range(count)]})
+
+	def testIterPages(self):
+		pages = list(proj1.iter_pages("x", 2, cache=self.cache))
+		self.assertEqual([len(p) for p in pages], [2, 2, 1])
+
+	def testIterMediaStopsEarly(self):
+		urls = [m.url for m in proj1.iter_media("x", 2, max_results=2, cache=self.cache)]
+		self.assertEqual(urls, ["0", "1"])
+		# the second page was never requested
+		self.assertEqual(self.cache.stats()["memory_hits"], 1)
+		self.assertEqual(len(list(proj1.iter_media("x", 2, cache=self.cache))), 5)
+
+	def testPrintPaged(self):
+		out = io.StringIO()
+		with contextlib.redirect_stdout(out):
+			urls = proj1.print_paged("x", 2, max_results=3, cache=self.cache)
+		self.assertEqual(urls, ["0", "1", "2"])
+		self.assertIn("3 Book by A (2000)", out.getvalue())
+		with contextlib.redirect_stdout(io.StringIO()):
+			urls = proj1.print_paged("x", 2, more=lambda: False, cache=self.cache)
+		self.assertEqual(urls, ["0", "1"])
+		prompts = []
+		with contextlib.redirect_stdout(io.StringIO()):
+			urls = proj1.print_paged("x", 2, more=lambda: prompts.append(1) or True, cache=self.cache)
+		self.assertEqual(len(urls), 5)
+		# no prompt after the short last page
+		self.assertEqual(len(prompts), 2)
+
+	def testIterMediaIndexes(self):
+		index = media_index.MediaIndex()
+		book = {"collectionName": "Book", "artistName": "A", "collectionViewUrl": "new", "releaseDate": "2000"}
+		session = FakeSession({"results": [book]})
+		with unittest.mock.patch.object(proj1, "requests", session):
+			media = list(proj1.iter_media("y", 2, cache=self.cache, index=index))
+		self.assertEqual([m.url for m in media], ["new"])
+		self.assertEqual(len(index), 1)
+
+class TestIndex(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.filename = os.path.join(self.dir.name, "index.bin")
+		self.records = [
+			proj1.media_to_dict(proj1.Song("Hey Jude", "The Beatles", "1968", "u1", "1", "Rock", 431333)),
+			proj1.media_to_dict(proj1.Song("Yesterday", "The Beatles", "1965", "u2", "Help!", "Rock", 125000)),
+			proj1.media_to_dict(proj1.Movie("Jaws", "Steven Spielberg", "1975", "u3", "PG", 7451455)),
+			proj1.media_to_dict(proj1.Media("Hey Jude Hey Jude", "Someone Else", "2001", "u4")),
+		]
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def testSearch(self):
+		index = media_index.MediaIndex()
+		self.assertEqual(index.add_all(self.records), 4)
+		self.assertEqual(index.add_all(self.records), 0)
+		urls = [record["url"] for score, record in index.search("hey jude")]
+		self.assertEqual(urls, ["u4", "u1"])
+		urls = [record["url"] for score, record in index.search("BEATLES rock")]
+		self.assertEqual(sorted(urls), ["u1", "u2"])
+		self.assertEqual(index.search("nothing"), [])
+
+	def testSaveAndLoad(self):
+		index = media_index.MediaIndex()
+		index.add_all(self.records[:3])
+		index.save(self.filename)
+		loaded = media_index.MediaIndex.load(self.filename)
+		self.assertEqual(len(loaded), 3)
+		self.assertEqual(loaded.search("jaws")[0][1], self.records[2])
+		loaded.add(self.records[3])
+		self.assertEqual(loaded.search("hey jude")[0][1]["url"], "u4")
+		loaded.save(self.filename)
+		loaded.close()
+		self.assertEqual(loaded.search("jaws")[0][1], self.records[2])
+		again = media_index.MediaIndex.load(self.filename)
+		expected = [(round(score, 9), record["url"]) for score, record in loaded.search("hey beatles")]
+		self.assertEqual([(round(score, 9), record["url"]) for score, record in again.search("hey beatles")], expected)
+		again.close()
+
+	def testSaveOverMappedFile(self):
+		index = media_index.MediaIndex()
+		index.add_all(self.records[:2])
+		index.save(self.filename)
+		loaded = media_index.MediaIndex.load(self.filename)
+		self.assertIsNone(loaded.url_set) # urls are not read on load
+		self.assertIsNone(loaded.add(self.records[0]))
+		self.assertEqual(loaded.urls, {"u1", "u2"})
+		loaded.add_all(self.records[2:] + [dict(self.records[3], url="u5", title="Café Ñandú")])
+		loaded.save(self.filename)
+		# the saved file is mapped again in place of the old one
+		self.assertEqual((loaded.loaded_docs, loaded.records, loaded.postings), (5, [], {}))
+		self.assertEqual(loaded.search("café")[0][1]["url"], "u5")
+		self.assertEqual(loaded.search("jaws")[0][1], self.records[2])
+		self.assertEqual(loaded.search("zzz"), [])
+		self.assertFalse(os.path.exists(self.filename + ".tmp"))
+		loaded.close()
+		self.assertEqual(loaded.search("ñandú")[0][1]["url"], "u5")
+
+	def testOfflineSearch(self):
+		index = media_index.MediaIndex()
+		index.add_all(self.records)
+		song = proj1.search_offline(index, "yesterday")[0]
+		self.assertEqual(type(song), proj1.Song)
+		self.assertEqual(song.info(), "Yesterday by The Beatles (1965) [Rock]")
+
 unittest.main()
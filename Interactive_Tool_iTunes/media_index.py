@@ -0,0 +1,380 @@
+'''Offline inverted index over fetched iTunes media
+
+MediaIndex keeps every media record it is given (the dicts made by
+iTunes.media_to_dict) and answers keyword searches over their title,
+author, album and genre with BM25 ranking, without the network.
+Records are keyed by url, so adding the same track twice is a no-op,
+and new records can be added at any time.
+
+The saved file is laid out so that load() only parses a small JSON
+header of counts; the term table, postings and records stay in a
+read-only memory map and are read when a query touches them:
+
+    MAGIC, header length (uint64), header JSON, padding to 8 bytes,
+    doc lengths (uint32), record offsets (uint32), term posting starts
+    (uint32), term offsets (uint32), posting doc ids (uint32), posting
+    term frequencies (uint16), terms (UTF-8, in byte order), records
+    (JSON lines)
+
+Terms are found by binary search over the sorted term bytes. The arrays
+are stored in the machine's byte order, which is recorded in the header.
+'''
+import bisect
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+FIELDS = ("title", "author", "album", "genre")
+MAGIC = b"MEDIAIX2"
+MAX_TF = 0xFFFF
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    '''returns the lower-cased words of text'''
+    return TOKEN.findall(str(text).casefold())
+
+
+def record_tokens(record):
+    '''returns the indexed words of a record's FIELDS'''
+    tokens = []
+    for field in FIELDS:
+        value = record.get(field)
+        if value is not None:
+            tokens += tokenize(value)
+    return tokens
+
+
+class SavedTerms:
+    '''the sorted term table of a saved index, as a sequence of the
+    terms' UTF-8 bytes read from the memory map
+
+    Attributes
+    ----------
+    starts : memoryview
+        Where each term's postings start; one extra entry holds the total,
+        so term i has starts[i + 1] - starts[i] postings.
+    offsets : memoryview
+        Where each term's bytes start in data, plus the end of the last.
+    '''
+
+    def __init__(self, data, position, starts, offsets):
+        self.data = data
+        self.position = position
+        self.starts = starts
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        position, offsets = self.position, self.offsets
+        return self.data[position + offsets[i]:position + offsets[i + 1]]
+
+    def find(self, term):
+        '''returns (start, document frequency) of a term, or None'''
+        key = term.encode()
+        i = bisect.bisect_left(self, key)
+        if i < len(self) and self[i] == key:
+            return self.starts[i], self.starts[i + 1] - self.starts[i]
+        return None
+
+    def terms(self):
+        '''yields every term, in order'''
+        for i in range(len(self)):
+            yield self[i].decode()
+
+
+class MediaIndex:
+    '''an inverted index of media records with BM25 search
+
+    Attributes
+    ----------
+    urls : set
+        The url of every indexed record (a property, see below).
+    lengths : array
+        Tokens per record, indexed by doc id.
+    total_length : int
+        Sum of lengths, for the average document length.
+    k1, b : float
+        BM25 parameters.
+    '''
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.url_set = set()     # None until needed after load(), see urls
+        self.lengths = array("I")
+        self.total_length = 0
+        self.postings = {}       # term -> (doc ids, term frequencies) in memory
+        self.records = []        # records added in memory
+        # set by load(): postings and records still in the memory map
+        self.saved_terms = None  # SavedTerms
+        self.loaded_docs = 0
+        self.filename = None
+        self.map = None
+        self.views = {}
+        self.norms = None        # cached BM25 length norms, see length_norms()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def urls(self):
+        '''the url of every indexed record; after load() the set is only
+        built, from the mapped records, the first time it is needed
+        '''
+        if self.url_set is None:
+            self.url_set = {self.record(doc_id)["url"] for doc_id in range(len(self.lengths))}
+        return self.url_set
+
+    def add(self, record):
+        '''indexes one record
+
+        Parameters
+        ----------
+        record : dict
+            A media record with at least a "url".
+
+        Returns
+        -------
+        int or None
+            The new doc id, or None if the url was already indexed.
+        '''
+        url = record["url"]
+        if url in self.urls:
+            return None
+        self.urls.add(url)
+        doc_id = len(self.lengths)
+        tokens = record_tokens(record)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            ids, tfs = self.mutable_postings(term)
+            ids.append(doc_id)
+            tfs.append(min(tf, MAX_TF))
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        self.records.append(record)
+        self.norms = None
+        return doc_id
+
+    def add_all(self, records):
+        '''indexes many records and returns how many were new'''
+        return sum(self.add(record) is not None for record in records)
+
+    def mutable_postings(self, term):
+        '''returns a term's postings as arrays that can be appended to,
+        copying them out of the memory map the first time
+        '''
+        postings = self.postings.get(term)
+        if postings is None:
+            ids, tfs = self.loaded_postings(term)
+            postings = (array("I", ids), array("H", tfs))
+            self.postings[term] = postings
+        return postings
+
+    def loaded_postings(self, term):
+        '''returns a term's postings from the memory map, or empty ones'''
+        entry = None if self.saved_terms is None else self.saved_terms.find(term)
+        if entry is None:
+            return (), ()
+        start, df = entry
+        return self.views["ids"][start:start + df], self.views["tfs"][start:start + df]
+
+    def get_postings(self, term):
+        postings = self.postings.get(term)
+        if postings is None:
+            return self.loaded_postings(term)
+        return postings
+
+    def record(self, doc_id):
+        '''returns the record with this doc id'''
+        if doc_id >= self.loaded_docs:
+            return self.records[doc_id - self.loaded_docs]
+        offsets = self.views["offsets"]
+        start = self.views["records_start"]
+        return json.loads(self.map[start + offsets[doc_id]:start + offsets[doc_id + 1]])
+
+    def length_norms(self):
+        '''returns k1 * (1 - b + b * length / average length) for every
+        doc id, recomputed only after records are added
+        '''
+        if self.norms is None:
+            k1, b = self.k1, self.b
+            average = self.total_length / len(self.lengths) or 1
+            self.norms = [k1 * (1 - b + b * length / average) for length in self.lengths]
+        return self.norms
+
+    def search(self, query, limit=10):
+        '''ranks records against a keyword query with BM25
+
+        Parameters
+        ----------
+        query : string
+            Keywords; every record containing at least one is scored.
+        limit : int
+            The most results to return.
+
+        Returns
+        -------
+        list
+            (score, record) pairs, best first
+        '''
+        n = len(self.lengths)
+        if n == 0:
+            return []
+        norms = self.length_norms()
+        scores = {}
+        for term in set(tokenize(query)):
+            ids, tfs = self.get_postings(term)
+            df = len(ids)
+            if df == 0:
+                continue
+            weight = math.log(1 + (n - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+            get = scores.get
+            for doc_id, tf in zip(ids, tfs):
+                scores[doc_id] = get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, self.record(doc_id)) for doc_id, score in best]
+
+    def save(self, filename):
+        '''writes the index to filename via a temporary file
+
+        If filename is the file this index has mapped, the map is released
+        before the file is replaced (Windows cannot replace a mapped file)
+        and the new file is mapped in its place.
+        '''
+        temporary = filename + ".tmp"
+        self.write(temporary)
+        if self.map is not None and os.path.exists(filename) and os.path.samefile(filename, self.filename):
+            # the new file holds everything, so map it instead of copying out
+            self.release()
+            os.replace(temporary, filename)
+            self.open_map(filename)
+        else:
+            os.replace(temporary, filename)
+
+    def write(self, filename):
+        '''writes the index to filename in the layout described above'''
+        terms = set(self.postings)
+        if self.saved_terms is not None:
+            terms.update(self.saved_terms.terms())
+        starts = array("I")
+        term_offsets = array("I", [0])
+        term_bytes = bytearray()
+        ids = array("I")
+        tfs = array("H")
+        for term in sorted(term.encode() for term in terms):
+            term_ids, term_tfs = self.get_postings(term.decode())
+            starts.append(len(ids))
+            ids.extend(term_ids)
+            tfs.extend(term_tfs)
+            term_bytes += term
+            term_offsets.append(len(term_bytes))
+        starts.append(len(ids))
+        offsets = array("I", [0])
+        blob = bytearray()
+        if self.loaded_docs:
+            # loaded records are copied as they are, without decoding
+            start, old = self.views["records_start"], self.views["offsets"]
+            blob += self.map[start:start + old[self.loaded_docs]]
+            offsets.extend(old[1:self.loaded_docs + 1])
+        for record in self.records:
+            blob += json.dumps(record).encode() + b"\n"
+            offsets.append(len(blob))
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "docs": len(self.lengths),
+            "postings": len(ids),
+            "terms": len(terms),
+            "term_bytes": len(term_bytes),
+            "total_length": self.total_length,
+        }).encode()
+        with open(filename, "wb") as fw:
+            fw.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            fw.write(b"\0" * (-fw.tell() % 8))
+            for part in (self.lengths, offsets, starts, term_offsets, ids, tfs):
+                fw.write(part.tobytes())
+            fw.write(term_bytes)
+            fw.write(blob)
+
+    @classmethod
+    def load(cls, filename, k1=1.2, b=0.75):
+        '''opens a saved index with a read-only memory map
+
+        Raises
+        ------
+        ValueError
+            If the file is not an index or was saved with another byte order.
+        '''
+        index = cls(k1, b)
+        index.open_map(filename)
+        return index
+
+    def open_map(self, filename):
+        '''makes this the index saved in filename, read through a memory
+        map; anything held in memory is dropped
+        '''
+        with open(filename, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.map
+        if data[:len(MAGIC)] != MAGIC:
+            self.release()
+            raise ValueError("{} is not a media index".format(filename))
+        size = struct.unpack_from("<Q", data, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        header = json.loads(data[start:start + size])
+        if header["byteorder"] != sys.byteorder:
+            self.release()
+            raise ValueError("{} was saved on a {}-endian machine".format(filename, header["byteorder"]))
+        position = start + size
+        position += -position % 8
+        view = memoryview(data)
+        docs, postings, terms = header["docs"], header["postings"], header["terms"]
+        for name, code, count in (("lengths", "I", docs), ("offsets", "I", docs + 1),
+                                  ("starts", "I", terms + 1), ("term_offsets", "I", terms + 1),
+                                  ("ids", "I", postings), ("tfs", "H", postings)):
+            width = array(code).itemsize
+            self.views[name] = view[position:position + count * width].cast(code)
+            position += count * width
+        self.saved_terms = SavedTerms(data, position, self.views["starts"], self.views["term_offsets"])
+        self.views["records_start"] = position + header["term_bytes"]
+        self.lengths = array("I", self.views.pop("lengths"))
+        self.total_length = header["total_length"]
+        self.postings = {}
+        self.records = []
+        self.loaded_docs = docs
+        self.url_set = None
+        self.norms = None
+        self.filename = filename
+
+    def close(self):
+        '''releases the memory map of a loaded index; postings and records
+        still in it are copied into memory first so the index stays usable
+        '''
+        if self.map is None:
+            return
+        for term in self.saved_terms.terms():
+            self.mutable_postings(term)
+        self.records[:0] = [self.record(doc_id) for doc_id in range(self.loaded_docs)]
+        self.release()
+
+    def release(self):
+        '''drops the memory map without copying anything out of it'''
+        self.saved_terms = None
+        self.loaded_docs = 0
+        for view in self.views.values():
+            if isinstance(view, memoryview):
+                view.release()
+        self.views = {}
+        self.map.close()
+        self.map = None
+        self.filename = None